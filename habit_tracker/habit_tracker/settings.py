@@ -20,11 +20,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'habits.routers.WriteMarkerMiddleware',
+    'habits.timezones.UserTimezoneMiddleware',
+    'habits.profiling.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -49,13 +53,29 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'habit_tracker.wsgi.application'
 
+# Copia de solo lectura para estadísticas y exportaciones (comando snapshot_analytics)
+HABITS_ANALYTICS_SNAPSHOT = BASE_DIR / 'analytics.sqlite3'
+# Antigüedad máxima de la copia en segundos; si es mayor se lee de 'default'
+HABITS_ANALYTICS_MAX_STALENESS = 300
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # En archivo y no en memoria: las pruebas de recompute_stats usan varios procesos
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    'analytics': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{HABITS_ANALYTICS_SNAPSHOT}?mode=ro',
+        'OPTIONS': {'uri': True},
+        # Archivo propio en las pruebas (sin MIRROR): AnalyticsRoutingTests copia ahí la base de pruebas
+        'TEST': {'NAME': BASE_DIR / 'test_analytics.sqlite3'},
+    },
 }
 
+DATABASE_ROUTERS = ['habits.routers.AnalyticsRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -72,15 +92,44 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 LANGUAGE_CODE = 'es-es'
+# Zona por defecto; cada usuario puede elegir la suya (UserProfile, UserTimezoneMiddleware)
 TIME_ZONE = 'America/Asuncion'
 USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic genera nombres con hash y copias .gz/.br (solo con DEBUG=False se usan las URLs
+# con hash). Nada en Django agrega cabeceras de caché a STATIC_URL: el servidor web que sirve
+# STATIC_ROOT debe enviar
+#     Cache-Control: public, max-age=31536000, immutable
+# y entregar los archivos precomprimidos (nginx: gzip_static on; brotli_static on;), p. ej.
+#     location /static/ { alias <STATIC_ROOT>/; gzip_static on; add_header Cache-Control "public, max-age=31536000, immutable"; }
+# Sin esas cabeceras, las visitas repetidas vuelven a pedir cada recurso (ver dashboard_bytes).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'habits.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'habit_list'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+# Días de historial que se conservan en HabitLog antes de archivarse (comando archive_logs)
+HABITS_ARCHIVE_AFTER_DAYS = 365
+# Filas por índice que examina ANALYZE en SQLite (rollover_day, archive_logs); 0 = todas, recorre
+# cada índice completo de las tablas más grandes
+HABITS_ANALYSIS_LIMIT = 1000
+
+# Perfilado de peticiones: staff con cabecera X-Profile o ?profile=1, o una fracción al azar
+HABITS_PROFILE_DIR = BASE_DIR / 'profiles'
+HABITS_PROFILE_SAMPLE_RATE = 0.0
+# Perfiles que se conservan en HABITS_PROFILE_DIR; al superarse se borran los más antiguos
+HABITS_PROFILE_MAX_PROFILES = 200
@@ -1,18 +1,135 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import Habit, HabitLog
+from .stats import invalidate_stats
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Sin filtros, usa la estimación de filas del motor (sqlite_stat1 / pg_class, que
+    actualizan rollover_day y archive_logs) en lugar de un COUNT(*) sobre toda la tabla. Con filtros, o si no hay
+    estimación o la tabla es chica, cuenta exacto.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = self._estimate(self.object_list)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimate(queryset):
+        table = queryset.model._meta.db_table
+        connection = connections[queryset.db]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    # Solo existe después de ejecutar ANALYZE; el primer número es la cantidad de filas
+                    cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                    row = cursor.fetchone()
+                    return int(row[0].split()[0]) if row else None
+                if connection.vendor == 'postgresql':
+                    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                    row = cursor.fetchone()
+                    return int(row[0]) if row and row[0] > 0 else None
+        except Exception:
+            return None
+        return None
+
+
+def is_changelist(request, model):
+    """Columnas mínimas solo en el listado: el formulario de edición usa todas."""
+    match = request.resolver_match
+    opts = model._meta
+    return match is not None and match.url_name == f'{opts.app_label}_{opts.model_name}_changelist'
+
 
 @admin.register(Habit)
 class HabitAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'goal_type', 'target', 'created_at', 'formatted_created_at']
     list_filter = ['goal_type', 'created_at']
+    list_select_related = ['user']
     search_fields = ['name', 'user__username']
-    
+    raw_id_fields = ['user']
+    # Temporizador y campos derivados: los mantienen las vistas, las señales, rollover_day y archive_logs
+    readonly_fields = [
+        'timer_state', 'timer_started_at', 'accumulated_time', 'last_paused_at',
+        'cached_streak', 'cached_completed', 'cached_registered', 'stats_date', 'archived_until',
+    ]
+    # La búsqueda del autocompletado de HabitLogAdmin pagina sobre este orden
+    ordering = ['name', 'id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['delete_future_logs']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_changelist(request, Habit):
+            return queryset
+        return queryset.select_related('user').only(
+            'id', 'name', 'goal_type', 'target', 'created_at', 'user__id', 'user__username'
+        )
+
     def formatted_created_at(self, obj):
         return obj.formatted_created_at()
     formatted_created_at.short_description = 'Creado el'
 
+    def delete_future_logs(self, request, queryset):
+        today = timezone.localdate()
+        deleted, _ = HabitLog.objects.filter(habit__in=queryset.values('id'), date__gt=today).delete()
+        # Un día futuro aquí puede ser hoy para un usuario en otra zona horaria
+        invalidate_stats(queryset.values('id'), since=today)
+        self.message_user(request, f'Registros futuros eliminados: {deleted}', messages.SUCCESS)
+    delete_future_logs.short_description = 'Eliminar registros futuros'
+
+
 @admin.register(HabitLog)
 class HabitLogAdmin(admin.ModelAdmin):
-    list_display = ['habit', 'date', 'value']
-    list_filter = ['date']
-    search_fields = ['habit__name']
\ No newline at end of file
+    list_display = ['habit', 'date', 'value', 'excluded']
+    list_filter = ['excluded']
+    list_select_related = ['habit']
+    date_hierarchy = 'date'
+    # Búsquedas exactas sobre columnas indexadas, sin LIKE sobre el join
+    search_fields = ['=habit__id', '=habit__user__username']
+    search_help_text = 'ID del hábito o nombre de usuario exacto'
+    autocomplete_fields = ['habit']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['exclude_logs', 'delete_future_logs']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not is_changelist(request, HabitLog):
+            return queryset
+        return queryset.select_related('habit').only(
+            'id', 'date', 'value', 'excluded', 'habit__id', 'habit__name'
+        )
+
+    def delete_queryset(self, request, queryset):
+        # delete_selected: en bloque, sin las señales por registro
+        habit_ids = list(queryset.order_by().values_list('habit_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        invalidate_stats(habit_ids)
+
+    def exclude_logs(self, request, queryset):
+        habit_ids = list(queryset.order_by().values_list('habit_id', flat=True).distinct())
+        updated = queryset.update(excluded=True, value=0)
+        invalidate_stats(habit_ids)
+        self.message_user(request, f'Registros excluidos: {updated}', messages.SUCCESS)
+    exclude_logs.short_description = 'Excluir registros seleccionados'
+
+    def delete_future_logs(self, request, queryset):
+        today = timezone.localdate()
+        future = queryset.filter(date__gt=today)
+        habit_ids = list(future.order_by().values_list('habit_id', flat=True).distinct())
+        deleted, _ = future.delete()
+        invalidate_stats(habit_ids, since=today)
+        self.message_user(request, f'Registros futuros eliminados: {deleted}', messages.SUCCESS)
+    delete_future_logs.short_description = 'Eliminar registros futuros seleccionados'
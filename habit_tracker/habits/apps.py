@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HabitsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'habits'
+
+    def ready(self):
+        # Mantiene al día las estadísticas precalculadas cuando cambia un HabitLog
+        from . import signals  # noqa: F401
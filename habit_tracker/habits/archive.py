@@ -0,0 +1,210 @@
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import ArchivedHabitLog, Habit, HabitLog, HabitLogSummary
+from .stats import log_completed
+
+# Días de historial que se mantienen en HabitLog
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+
+def archive_cutoff(today=None, days=None):
+    """Primer día del mes que contiene (hoy - horizonte): se archivan solo meses completos."""
+    today = today or timezone.localdate()
+    if days is None:
+        days = getattr(settings, 'HABITS_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+    return (today - timedelta(days=days)).replace(day=1)
+
+
+def previous_month(month):
+    return (month - timedelta(days=1)).replace(day=1)
+
+
+def archived_totals(habit):
+    """(completados, registrados) sumando los resúmenes archivados del hábito."""
+    if not habit.archived_until:
+        return 0, 0
+    totals = HabitLogSummary.objects.filter(habit=habit).aggregate(
+        completed=Sum('completed'), registered=Sum('registered')
+    )
+    return totals['completed'] or 0, totals['registered'] or 0
+
+
+def archived_streak(habit, day):
+    """
+    Continúa una racha hacia atrás desde `day` (incluido) dentro de la zona archivada.
+    Los meses en que todos los días están completados o excluidos se cuentan con su resumen;
+    el primer mes incompleto se recorre día a día.
+    """
+    summaries = {
+        s.month: s for s in HabitLogSummary.objects.filter(habit=habit, month__lte=day)
+    }
+    count = 0
+    month = day.replace(day=1)
+    while month in summaries:
+        summary = summaries[month]
+        days_in_month = calendar.monthrange(month.year, month.month)[1]
+        if summary.completed + summary.excluded == days_in_month:
+            count += summary.completed
+            month = previous_month(month)
+            continue
+
+        month_end = month.replace(day=days_in_month)
+        logs = {
+            log_date: (value, excluded)
+            for log_date, value, excluded in ArchivedHabitLog.objects.filter(
+                habit=habit, date__gte=month, date__lte=month_end
+            ).values_list('date', 'value', 'excluded')
+        }
+        current_day = month_end
+        while current_day in logs:
+            value, excluded = logs[current_day]
+            if not excluded:
+                if not log_completed(habit, value):
+                    break
+                count += 1
+            current_day -= timedelta(days=1)
+        break
+    return count
+
+
+def archive_logs(cutoff, habits=None, batch_size=500):
+    """
+    Mueve los registros anteriores a `cutoff` (inicio de mes) al archivo y actualiza
+    los resúmenes mensuales. Devuelve la cantidad de registros archivados.
+    """
+    habits = habits if habits is not None else Habit.objects.all()
+    habit_ids = list(habits.filter(habitlog__date__lt=cutoff).distinct().values_list('id', flat=True))
+
+    archived = 0
+    for i in range(0, len(habit_ids), batch_size):
+        chunk = habit_ids[i:i + batch_size]
+        with transaction.atomic():
+            archived += _archive_chunk(chunk, cutoff)
+    return archived
+
+
+def _summarize(habits, rows):
+    """Totales mensuales {(habit_id, mes): {...}} de registros archivados, con la meta actual de cada hábito."""
+    totals = defaultdict(lambda: {'completed': 0, 'excluded': 0, 'registered': 0, 'value_sum': 0.0})
+    for row in rows:
+        summary = totals[(row.habit_id, row.date.replace(day=1))]
+        summary['registered'] += 1
+        summary['value_sum'] += row.value or 0
+        if row.excluded:
+            summary['excluded'] += 1
+        elif log_completed(habits[row.habit_id], row.value):
+            summary['completed'] += 1
+    return totals
+
+
+def _archive_chunk(habit_ids, cutoff):
+    habits = {h.id: h for h in Habit.objects.filter(id__in=habit_ids).only('id', 'goal_type', 'target', 'archived_until')}
+    logs = HabitLog.objects.filter(habit_id__in=habit_ids, date__lt=cutoff)
+
+    rows = [
+        ArchivedHabitLog(habit_id=habit_id, date=log_date, value=value, excluded=excluded)
+        for habit_id, log_date, value, excluded in logs.order_by('habit_id', 'date', 'id').values_list(
+            'habit_id', 'date', 'value', 'excluded'
+        )
+    ]
+    totals = _summarize(habits, rows)
+
+    # Sumar a resúmenes previos del mismo mes, si los hubiera
+    existing = {
+        (s.habit_id, s.month): s
+        for s in HabitLogSummary.objects.filter(habit_id__in=habit_ids, month__lt=cutoff)
+    }
+    new_summaries = []
+    for key, values in totals.items():
+        summary = existing.get(key)
+        if summary is None:
+            new_summaries.append(HabitLogSummary(habit_id=key[0], month=key[1], **values))
+            continue
+        for field, value in values.items():
+            setattr(summary, field, getattr(summary, field) + value)
+
+    ArchivedHabitLog.objects.bulk_create(rows, batch_size=1000)
+    HabitLogSummary.objects.bulk_create(new_summaries, batch_size=1000)
+    HabitLogSummary.objects.bulk_update(
+        existing.values(), ['completed', 'excluded', 'registered', 'value_sum'], batch_size=1000
+    )
+    logs.delete()
+
+    for habit in habits.values():
+        if habit.archived_until is None or habit.archived_until < cutoff:
+            habit.archived_until = cutoff
+    Habit.objects.bulk_update(habits.values(), ['archived_until'])
+    return len(rows)
+
+
+def rebuild_summaries(habit):
+    """
+    Recalcula desde ArchivedHabitLog los resúmenes mensuales de un hábito. Los resúmenes
+    guardan días completados según la meta del momento en que se archivaron, así que hay
+    que reconstruirlos cuando cambia goal_type o target.
+    """
+    rows = ArchivedHabitLog.objects.filter(habit=habit).only('habit', 'date', 'value', 'excluded')
+    totals = _summarize({habit.id: habit}, rows.iterator(chunk_size=2000))
+    with transaction.atomic():
+        HabitLogSummary.objects.filter(habit=habit).delete()
+        HabitLogSummary.objects.bulk_create(
+            [HabitLogSummary(habit_id=key[0], month=key[1], **values) for key, values in totals.items()],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def restore_logs(habits=None, batch_size=500):
+    """
+    Devuelve los registros archivados a HabitLog y borra los resúmenes, por bloques de hábitos.
+    Si un día archivado ya tiene registro en HabitLog (se registró después de archivar), se
+    conserva el de HabitLog y el archivado se descarta.
+    Devuelve (restaurados, descartados por conflicto).
+    """
+    habits = habits if habits is not None else Habit.objects.all()
+    habit_ids = list(habits.filter(archived_until__isnull=False).values_list('id', flat=True))
+
+    restored = conflicts = 0
+    for i in range(0, len(habit_ids), batch_size):
+        with transaction.atomic():
+            chunk_restored, chunk_conflicts = _restore_chunk(habit_ids[i:i + batch_size])
+        restored += chunk_restored
+        conflicts += chunk_conflicts
+    return restored, conflicts
+
+
+def _restore_chunk(habit_ids, batch_size=1000):
+    archived = ArchivedHabitLog.objects.filter(habit_id__in=habit_ids)
+    last_archived = Habit.objects.filter(id__in=habit_ids).aggregate(Max('archived_until'))['archived_until__max']
+    # Solo pueden chocar los registros de HabitLog de la zona archivada
+    hot_days = set(
+        HabitLog.objects.filter(habit_id__in=habit_ids, date__lt=last_archived).values_list('habit_id', 'date')
+    )
+
+    restored = conflicts = 0
+    rows = []
+    for habit_id, log_date, value, excluded in archived.values_list(
+        'habit_id', 'date', 'value', 'excluded'
+    ).iterator(chunk_size=2000):
+        if (habit_id, log_date) in hot_days:
+            conflicts += 1
+            continue
+        rows.append(HabitLog(habit_id=habit_id, date=log_date, value=value, excluded=excluded))
+        if len(rows) == batch_size:
+            HabitLog.objects.bulk_create(rows)
+            restored += len(rows)
+            rows = []
+    HabitLog.objects.bulk_create(rows)
+    restored += len(rows)
+
+    archived.delete()
+    HabitLogSummary.objects.filter(habit_id__in=habit_ids).delete()
+    Habit.objects.filter(id__in=habit_ids).update(archived_until=None)
+    return restored, conflicts
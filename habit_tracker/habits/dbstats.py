@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import connections
+
+# Filas por índice que examina ANALYZE en SQLite (PRAGMA analysis_limit); 0 = sin límite
+DEFAULT_ANALYSIS_LIMIT = 1000
+
+
+def refresh_row_estimates(models, using='default'):
+    """
+    Actualiza las estadísticas del motor (ANALYZE) de las tablas de `models`: las usan el
+    planificador y EstimatedCountPaginator. En SQLite sqlite_stat1 no existe hasta el primer ANALYZE.
+
+    Un ANALYZE completo de SQLite recorre todos los índices de la tabla; con HABITS_ANALYSIS_LIMIT
+    examina a lo sumo esa cantidad de filas por índice y la cantidad de filas queda aproximada,
+    suficiente para el conteo del admin. En PostgreSQL ANALYZE ya trabaja sobre una muestra.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            limit = getattr(settings, 'HABITS_ANALYSIS_LIMIT', DEFAULT_ANALYSIS_LIMIT)
+            cursor.execute(f"PRAGMA analysis_limit = {int(limit)}")
+        for model in models:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from .history import parse_cursor
 from .models import Habit
+from .timezones import timezone_choices
 
 class UserRegisterForm(UserCreationForm):
     email = forms.EmailField(
@@ -50,4 +52,30 @@ class HabitForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['target'].required = False
\ No newline at end of file
+        self.fields['target'].required = False
+
+class HistoryFilterForm(forms.Form):
+    STATUS_CHOICES = [
+        ('', 'Todos'),
+        ('completed', 'Completados'),
+        ('missed', 'No completados'),
+        ('excluded', 'Excluidos'),
+    ]
+
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    status = forms.ChoiceField(required=False, choices=STATUS_CHOICES, widget=forms.Select(attrs={'class': 'form-control'}))
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if cursor:
+            try:
+                parse_cursor(cursor)
+            except ValueError:
+                raise forms.ValidationError('Cursor de paginación inválido. Vuelve a la primera página.')
+        return cursor or None
+
+
+class TimezoneForm(forms.Form):
+    timezone = forms.ChoiceField(choices=timezone_choices, widget=forms.Select(attrs={'class': 'form-control'}))
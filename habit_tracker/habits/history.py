@@ -0,0 +1,71 @@
+from datetime import date
+
+from .models import ArchivedHabitLog, HabitLog
+
+PAGE_SIZE = 30
+FIELDS = ('id', 'date', 'value', 'excluded')
+
+
+def parse_cursor(cursor):
+    """'AAAA-MM-DD' -> date; ValueError si el cursor no es válido (p. ej. los antiguos 'fecha_id')."""
+    try:
+        return date.fromisoformat(cursor)
+    except TypeError:
+        raise ValueError(f'Cursor inválido: {cursor!r}')
+
+
+def make_cursor(row):
+    # (habit, date) es único: la fecha sola identifica la posición
+    return row['date'].isoformat()
+
+
+def _filtered(queryset, habit, start=None, end=None, status=''):
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+
+    threshold = 1 if habit.goal_type == 'boolean' else habit.target
+    if status == 'completed':
+        queryset = queryset.filter(excluded=False, value__gte=threshold)
+    elif status == 'missed':
+        queryset = queryset.filter(excluded=False, value__lt=threshold)
+    elif status == 'excluded':
+        queryset = queryset.filter(excluded=True)
+    return queryset.order_by('-date').values(*FIELDS)
+
+
+def _sources(habit, filters):
+    """Registros activos y, por debajo de archived_until, los archivados (rangos de fechas disjuntos)."""
+    yield _filtered(HabitLog.objects.filter(habit=habit), habit, **filters)
+    if habit.archived_until:
+        yield _filtered(ArchivedHabitLog.objects.filter(habit=habit), habit, **filters)
+
+
+def history_page(habit, filters, cursor=None, limit=PAGE_SIZE):
+    """
+    Página de registros, del más reciente al más antiguo, con paginación por clave (date).
+    Devuelve (filas, siguiente_cursor). El cursor es un límite de rango sobre el índice único
+    (habit_id, date), así que el costo no depende de la profundidad de la página.
+    Un cursor inválido levanta ValueError: volver a la primera página duplicaría filas.
+    """
+    day = parse_cursor(cursor) if cursor else None
+    rows = []
+    for queryset in _sources(habit, filters):
+        if day:
+            queryset = queryset.filter(date__lt=day)
+        rows.extend(queryset[:limit + 1 - len(rows)])
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = make_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def iter_history(habit, filters):
+    """Todos los registros del rango, en streaming y sin cargar la tabla en memoria."""
+    for queryset in _sources(habit, filters):
+        yield from queryset.iterator(chunk_size=2000)
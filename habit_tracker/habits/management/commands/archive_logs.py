@@ -0,0 +1,42 @@
+# habits/management/commands/archive_logs.py
+from django.core.management.base import BaseCommand, CommandError
+from habits.archive import archive_cutoff, archive_logs, restore_logs
+from habits.dbstats import refresh_row_estimates
+from habits.models import ArchivedHabitLog, HabitLog
+
+
+class Command(BaseCommand):
+    help = 'Archiva los registros antiguos en resúmenes mensuales (o los restaura)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Días de historial a conservar en HabitLog (por defecto HABITS_ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--restore',
+            action='store_true',
+            help='Devolver todos los registros archivados a HabitLog',
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored, conflicts = restore_logs()
+            refresh_row_estimates([HabitLog, ArchivedHabitLog])
+            if conflicts:
+                self.stdout.write(self.style.WARNING(
+                    f"Registros archivados descartados (el día ya tenía registro en HabitLog): {conflicts}"
+                ))
+            self.stdout.write(self.style.SUCCESS(f"Registros restaurados: {restored}"))
+            return
+
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days no puede ser negativo')
+
+        cutoff = archive_cutoff(days=options['days'])
+        self.stdout.write(f"=== ARCHIVANDO REGISTROS ANTERIORES A {cutoff} ===")
+        archived = archive_logs(cutoff)
+        # Las tablas cambiaron mucho de tamaño: actualizar la estimación que usa el admin
+        refresh_row_estimates([HabitLog, ArchivedHabitLog])
+        self.stdout.write(self.style.SUCCESS(f"Registros archivados: {archived}"))
@@ -0,0 +1,72 @@
+# habits/management/commands/dashboard_bytes.py
+import gzip
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+STATIC_REF = re.compile(r'(?:href|src)="(%s[^"?#]+)' % re.escape(settings.STATIC_URL))
+
+
+class Command(BaseCommand):
+    help = 'Mide los bytes transferidos por una vista del panel (primera visita y repetida)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Usuario con el que se renderiza el panel (por defecto el primero con hábitos)')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(habit__isnull=False).first()
+        if user is None:
+            raise CommandError('No se encontró un usuario para renderizar el panel')
+
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('habit_list'))
+        html = response.content
+        html_gz = len(gzip.compress(html))
+
+        self.stdout.write(f"=== PANEL DE {user.username} ===")
+        self.stdout.write(f"HTML: {len(html)} bytes ({html_gz} con gzip)")
+
+        # Nombres con hash del manifiesto (collectstatic con DEBUG=False); vacío en desarrollo
+        hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        assets_gz = 0
+        unhashed = []
+        for url in sorted(set(STATIC_REF.findall(html.decode()))):
+            name = url[len(settings.STATIC_URL):]
+            with open(self.resolve(name), 'rb') as f:
+                content = f.read()
+            size_gz = len(gzip.compress(content))
+            assets_gz += size_gz
+            self.stdout.write(f"  {url}: {len(content)} bytes ({size_gz} con gzip)")
+            if name not in hashed_names:
+                unhashed.append(url)
+
+        self.stdout.write(f"Primera visita: {html_gz + assets_gz} bytes con gzip")
+        if unhashed:
+            # Sin hash el navegador revalida (o vuelve a descargar) cada recurso en cada visita
+            self.stdout.write(self.style.WARNING(
+                f"Recursos sin hash en el nombre: {', '.join(unhashed)}. Solo quedan en caché entre visitas "
+                "con DEBUG=False tras collectstatic y las cabeceras de caché del servidor (ver STATIC_ROOT en settings)"
+            ))
+        # Los recursos estáticos con hash se cachean: en visitas repetidas solo viaja el HTML
+        self.stdout.write(self.style.SUCCESS(f"Visitas siguientes: {html_gz} bytes con gzip"))
+
+    @staticmethod
+    def resolve(name):
+        """Archivo de un recurso: en STATIC_ROOT (nombres con hash tras collectstatic) o en los finders."""
+        if staticfiles_storage.exists(name):
+            return staticfiles_storage.path(name)
+        path = finders.find(name)
+        if not path:
+            # Omitirlo subestimaría la primera visita
+            raise CommandError(f'No se encontró el recurso estático {name}; ¿falta ejecutar collectstatic?')
+        return path
@@ -1,5 +1,6 @@
 from django.utils import timezone
 from habits.models import Habit, HabitLog
+from habits.stats import invalidate_stats
 
 # Eliminar todos los logs futuros de todos los hábitos
 today = timezone.localdate()
@@ -11,7 +12,9 @@ for log in future_logs:
 
 # Eliminarlos
 if future_logs.exists():
+    habit_ids = list(future_logs.values_list('habit_id', flat=True).distinct())
     future_logs.delete()
+    invalidate_stats(habit_ids, since=today)
     print("¡Logs futuros eliminados!")
 else:
     print("No hay logs futuros para eliminar")
\ No newline at end of file
@@ -0,0 +1,54 @@
+# habits/management/commands/list_profiles.py
+import io
+import json
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+from habits.profiling import profile_dir
+
+
+class Command(BaseCommand):
+    help = 'Lista las peticiones perfiladas más lentas y resume sus perfiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Cantidad de peticiones a listar')
+        parser.add_argument('--view', help='Solo peticiones de esta vista (p. ej. habit_list)')
+        parser.add_argument('--show', help='ID de una petición: imprime sus funciones más costosas')
+        parser.add_argument('--top', type=int, default=20, help='Funciones a mostrar con --show')
+
+    def handle(self, *args, **options):
+        directory = profile_dir()
+        if options['show']:
+            self.show(directory, options['show'], options['top'])
+            return
+
+        records = []
+        for path in directory.glob('*.json'):
+            with open(path) as f:
+                record = json.load(f)
+            if options['view'] and record['view'] != options['view']:
+                continue
+            records.append(record)
+
+        if not records:
+            self.stdout.write(f"No hay perfiles en {directory}")
+            return
+
+        records.sort(key=lambda r: r['duration_ms'], reverse=True)
+        self.stdout.write(f"=== {min(len(records), options['limit'])} DE {len(records)} PETICIONES PERFILADAS ===")
+        for record in records[:options['limit']]:
+            self.stdout.write(
+                f"{record['duration_ms']:>9.1f} ms  {record['status']}  {record['method']} {record['path']}"
+                f"  ({record['user'] or 'anónimo'})  {record['id']}"
+            )
+
+    def show(self, directory, profile_id, top):
+        path = directory / f"{profile_id}.pstats"
+        if not path.exists():
+            raise CommandError(f"No existe el perfil {profile_id}")
+
+        output = io.StringIO()
+        stats = pstats.Stats(str(path), stream=output)
+        stats.sort_stats('cumulative').print_stats(top)
+        self.stdout.write(output.getvalue())
+        self.stdout.write(f"Pila para flamegraph: {directory / (profile_id + '.collapsed')}")
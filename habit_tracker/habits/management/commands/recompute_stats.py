@@ -0,0 +1,106 @@
+# habits/management/commands/recompute_stats.py
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from habits.models import Habit, HabitLog
+from habits.timezones import group_users_by_local_date
+
+
+def _init_worker():
+    """Cada proceso abre su propia conexión a la base de datos."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _recompute_chunk(user_ids, today, stale_only=False):
+    # En los procesos del pool la conexión es propia y se cierra al terminar el proceso;
+    # en el camino secuencial es la del llamador (rollover_day), que no se cierra aquí
+    from habits.stats import recompute_users
+    return recompute_users(user_ids, today, stale_only)
+
+
+class Command(BaseCommand):
+    help = 'Recalcula rachas y totales precalculados de todos los hábitos en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Cantidad de procesos (1 = sin paralelismo)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Usuarios por bloque de trabajo',
+        )
+        parser.add_argument(
+            '--since',
+            help='Solo usuarios con registros desde esta fecha (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--stale-only',
+            action='store_true',
+            help='Solo hábitos cuyas estadísticas no corresponden al día local del usuario',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        chunk_size = options['chunk_size']
+        if workers < 1 or chunk_size < 1:
+            raise CommandError('--workers y --chunk-size deben ser mayores que 0')
+
+        user_ids = Habit.objects.values_list('user_id', flat=True)
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since debe tener formato YYYY-MM-DD')
+            user_ids = HabitLog.objects.filter(date__gte=since).values_list('habit__user_id', flat=True)
+        user_ids = sorted(set(user_ids))
+
+        # Cada bloque tiene usuarios con la misma fecha local (misma zona o mismo desfase)
+        chunks = []
+        for today, ids in sorted(group_users_by_local_date(user_ids).items()):
+            chunks.extend((ids[i:i + chunk_size], today) for i in range(0, len(ids), chunk_size))
+        self.stdout.write(f"=== RECALCULANDO {len(user_ids)} USUARIOS EN {len(chunks)} BLOQUES ===")
+
+        start = time.monotonic()
+        total = 0
+        if workers == 1 or len(chunks) <= 1:
+            for i, (chunk, today) in enumerate(chunks, 1):
+                total += _recompute_chunk(chunk, today, options['stale_only'])
+                self._progress(i, len(chunks), total, start)
+        else:
+            # Las conexiones abiertas no deben heredarse en los procesos hijos
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_recompute_chunk, chunk, today, options['stale_only'])
+                    for chunk, today in chunks
+                ]
+                for i, future in enumerate(as_completed(futures), 1):
+                    total += future.result()
+                    self._progress(i, len(chunks), total, start)
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {total} hábitos en {elapsed:.1f}s ({self._rate(total, elapsed):.0f} hábitos/s)"
+        ))
+
+    def _progress(self, done, total_chunks, habits, start):
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"  Bloque {done}/{total_chunks}: {habits} hábitos, {self._rate(habits, elapsed):.0f} hábitos/s"
+        )
+
+    @staticmethod
+    def _rate(count, elapsed):
+        return count / elapsed if elapsed > 0 else float(count)
@@ -0,0 +1,62 @@
+# habits/management/commands/rollover_day.py
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from habits.dbstats import refresh_row_estimates
+from habits.models import Habit, HabitLog, UserProfile
+from habits.timers import sweep_expired_timers
+from habits.timezones import get_zone, next_midnight
+
+
+def seconds_until_next_rollover(now=None):
+    """Segundos hasta la próxima medianoche local de cualquiera de las zonas en uso."""
+    now = now or timezone.now()
+    names = set(UserProfile.objects.values_list('timezone', flat=True).distinct())
+    names.add(settings.TIME_ZONE)
+    midnight = min(next_midnight(get_zone(name), now) for name in names)
+    return max(0.0, (midnight - now).total_seconds())
+
+
+class Command(BaseCommand):
+    help = 'Cierra el día anterior y precalcula el estado del panel para el nuevo día'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wait',
+            action='store_true',
+            help='Quedarse en ejecución y repetir en cada medianoche local de las zonas en uso',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Procesos para el recálculo (ver recompute_stats)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            if options['wait']:
+                delay = seconds_until_next_rollover()
+                self.stdout.write(f"Esperando {delay / 3600:.1f}h hasta la próxima medianoche local")
+                # Pequeño margen para quedar del lado del día nuevo
+                time.sleep(delay + 1)
+
+            self.rollover(options['workers'])
+            if not options['wait']:
+                break
+
+    def rollover(self, workers):
+        self.stdout.write(f"=== ROLLOVER {timezone.localtime():%Y-%m-%d %H:%M} ===")
+
+        # 1. Temporizadores que quedaron corriendo antes de la medianoche de cada usuario
+        processed = sweep_expired_timers()
+        self.stdout.write(f"Temporizadores cerrados: {processed}")
+
+        # 2. Rachas y totales de los usuarios cuyo día local cambió (las rachas rotas quedan en 0)
+        call_command('recompute_stats', workers=workers, stale_only=True, stdout=self.stdout._out)
+
+        # 3. Estimación de filas para las listas del admin (sqlite_stat1 / pg_class)
+        refresh_row_estimates([Habit, HabitLog])
@@ -0,0 +1,35 @@
+# habits/management/commands/snapshot_analytics.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from habits.routers import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Copia la base principal a la réplica de solo lectura usada por estadísticas y exportaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Repetir cada N segundos (menor que HABITS_ANALYTICS_MAX_STALENESS)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval < 0:
+            raise CommandError('--interval no puede ser negativo')
+
+        while True:
+            start = time.monotonic()
+            try:
+                path = take_snapshot()
+            except ValueError as e:
+                raise CommandError(str(e))
+            stamp = timezone.localtime().strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(f"[{stamp}] Copia actualizada: {path} ({time.monotonic() - start:.2f}s)")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,31 @@
+# habits/management/commands/sweep_timers.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from habits.timers import sweep_expired_timers
+
+
+class Command(BaseCommand):
+    help = 'Cierra los temporizadores que alcanzaron su meta o pasaron la medianoche'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Repetir cada N segundos (0 = una sola ejecución, p. ej. desde cron)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval < 0:
+            raise CommandError('--interval no puede ser negativo')
+
+        while True:
+            processed = sweep_expired_timers()
+            stamp = timezone.localtime().strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(f"[{stamp}] Temporizadores cerrados: {processed}")
+            if not interval:
+                break
+            time.sleep(interval)
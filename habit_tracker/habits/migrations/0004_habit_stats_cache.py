@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0003_habit_accumulated_time_habit_last_paused_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='cached_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='cached_registered',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='cached_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='stats_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
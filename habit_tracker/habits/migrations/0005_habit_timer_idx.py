@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_habit_stats_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['timer_state', 'timer_started_at'], name='habit_timer_idx'),
+        ),
+    ]
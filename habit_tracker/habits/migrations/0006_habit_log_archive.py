@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0005_habit_timer_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='archived_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedHabitLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.FloatField(default=0.0)),
+                ('excluded', models.BooleanField(default=False)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='habits.habit')),
+            ],
+            options={
+                'unique_together': {('habit', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HabitLogSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('completed', models.IntegerField(default=0)),
+                ('excluded', models.IntegerField(default=0)),
+                ('registered', models.IntegerField(default=0)),
+                ('value_sum', models.FloatField(default=0.0)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='habits.habit')),
+            ],
+            options={
+                'unique_together': {('habit', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0006_habit_log_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habitlog',
+            index=models.Index(fields=['date'], name='habitlog_date_idx'),
+        ),
+    ]
@@ -1,9 +1,20 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 import json
 
+from .timezones import local_today
+
+class UserProfile(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE)
+
+    def __str__(self):
+        return f"{self.user.username} ({self.timezone})"
+
+
 class Habit(models.Model):
     GOAL_TYPES = [
         ('boolean', 'Sí/No'),
@@ -22,20 +33,51 @@ class Habit(models.Model):
     timer_started_at = models.DateTimeField(null=True, blank=True)
     accumulated_time = models.FloatField(default=0.0)  # tiempo acumulado en segundos
     last_paused_at = models.DateTimeField(null=True, blank=True)
-    
+
+    # Estadísticas precalculadas (ver habits/stats.py y el comando recompute_stats)
+    cached_streak = models.IntegerField(default=0)
+    cached_completed = models.IntegerField(default=0)
+    cached_registered = models.IntegerField(default=0)
+    stats_date = models.DateField(null=True, blank=True)  # día local para el que son válidas
+
+    # Los registros anteriores a esta fecha están archivados (ver habits/archive.py)
+    archived_until = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Usado por el barrido de temporizadores (sweep_timers)
+            models.Index(fields=['timer_state', 'timer_started_at'], name='habit_timer_idx'),
+        ]
+
     def __str__(self):
         return self.name
     
     def formatted_created_at(self):
         return self.created_at.strftime("%d/%m/%Y")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Meta leída de la base: si cambia, las estadísticas precalculadas dejan de valer (habits/signals.py)
+        if {'goal_type', 'target'} <= set(instance.__dict__):
+            instance._loaded_goal = (instance.goal_type, instance.target)
+        return instance
+
+    def has_fresh_stats(self):
+        """Las estadísticas precalculadas corresponden al día local actual."""
+        return self.stats_date is not None and self.stats_date == local_today()
+
     @property
     def current_streak(self):
         """
         Cuenta días consecutivos hacia atrás que cumplen la meta.
-        Usa timezone.localdate() para coherencia con el resto de la app.
+        Usa el día local del usuario (local_today) para coherencia con el resto de la app.
         Los días 'excluded' no rompen la racha (se saltan).
+        Si la racha ya fue precalculada para hoy (rollover_day), se usa ese valor.
         """
+        if self.has_fresh_stats():
+            return self.cached_streak
+
         logs_manager = self.habitlog_set  # relacionado estándar
         if logs_manager is None:
             return 0
@@ -44,7 +86,7 @@ class Habit(models.Model):
             return logs_manager.filter(date=day).order_by('-id').first()
 
         count = 0
-        today = timezone.localdate()
+        today = local_today()
 
         # Si no hay log válido hoy (no excluido), empezar desde ayer; si hay solo excluded, el bucle lo saltará.
         if not logs_manager.filter(date=today).exists():
@@ -55,6 +97,10 @@ class Habit(models.Model):
         while True:
             log = get_log_for(current_day)
             if not log:
+                # La racha llega a la zona archivada: seguir con los resúmenes mensuales
+                if self.archived_until and current_day < self.archived_until:
+                    from .archive import archived_streak
+                    count += archived_streak(self, current_day)
                 break
 
             if getattr(log, 'excluded', False):
@@ -84,22 +130,23 @@ class Habit(models.Model):
         return count
     
     def is_completed_today(self):
-        today = timezone.localdate()
-        try:
-            log = HabitLog.objects.get(habit=self, date=today)
-            if log.excluded:
-                return False
-            if self.goal_type == 'boolean':
-                return log.value >= 1
-            else:
-                return log.value >= self.target
-        except HabitLog.DoesNotExist:
+        today = local_today()
+        # habit_list precarga el registro de hoy para evitar una consulta por tarjeta
+        if hasattr(self, 'today_log'):
+            log = self.today_log
+        else:
+            log = HabitLog.objects.filter(habit=self, date=today).first()
+        if log is None or log.excluded:
             return False
+        if self.goal_type == 'boolean':
+            return log.value >= 1
+        else:
+            return log.value >= self.target
     
     def hours_until_midnight(self):
-        now = timezone.now()
-        tomorrow = now + timedelta(days=1)
-        midnight = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Medianoche del día local, no de UTC
+        now = timezone.localtime()
+        midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min))
         time_left = midnight - now
         return int(time_left.total_seconds() // 3600), int((time_left.total_seconds() % 3600) // 60)
     
@@ -147,7 +194,46 @@ class HabitLog(models.Model):
     
     class Meta:
         unique_together = ['habit', 'date']
+        indexes = [
+            # date_hierarchy del admin y filtros por fecha en toda la tabla
+            models.Index(fields=['date'], name='habitlog_date_idx'),
+        ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado leído de la base: las señales (habits/signals.py) lo usan para ajustar las estadísticas
+        if {'date', 'value', 'excluded'} <= set(instance.__dict__):
+            instance._loaded_state = (instance.date, instance.value, instance.excluded)
+        return instance
+
     def __str__(self):
         status = " (excluido)" if self.excluded else ""
-        return f"{self.habit.name} - {self.date}{status}"
\ No newline at end of file
+        return f"{self.habit.name} - {self.date}{status}"
+
+
+class HabitLogSummary(models.Model):
+    """Resumen mensual de los registros archivados de un hábito."""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
+    month = models.DateField()  # primer día del mes
+    completed = models.IntegerField(default=0)
+    excluded = models.IntegerField(default=0)
+    registered = models.IntegerField(default=0)
+    value_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ['habit', 'month']
+
+    def __str__(self):
+        return f"{self.habit.name} - {self.month:%Y-%m}"
+
+
+class ArchivedHabitLog(models.Model):
+    """Registro diario movido fuera de HabitLog; solo se lee para restaurar o en rachas largas."""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
+    date = models.DateField()
+    value = models.FloatField(default=0.0)
+    excluded = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ['habit', 'date']
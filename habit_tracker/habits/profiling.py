@@ -0,0 +1,139 @@
+import cProfile
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+# Valores por defecto si no están en settings
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_SAMPLE_INTERVAL = 0.005  # segundos entre muestras de pila
+DEFAULT_MAX_PROFILES = 200  # perfiles que se conservan; los más antiguos se borran
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on', 'si', 'sí'}
+
+
+def profile_dir():
+    return Path(getattr(settings, 'HABITS_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def flag(value):
+    """'1', 'true', 'on'... -> True; ausente, '0', 'false' o cualquier otro valor -> False."""
+    return (value or '').strip().lower() in TRUE_VALUES
+
+
+def prune_profiles(directory, keep):
+    """Borra los perfiles más antiguos (sus tres archivos) hasta dejar `keep`. Devuelve cuántos borró."""
+    # El nombre empieza con la fecha y hora, así que el orden alfabético es cronológico
+    records = sorted(directory.glob('*.json'))
+    stale = records[:max(0, len(records) - keep)]
+    for record in stale:
+        for suffix in ('.json', '.pstats', '.collapsed'):
+            record.with_suffix(suffix).unlink(missing_ok=True)
+    return len(stale)
+
+
+class StackSampler(threading.Thread):
+    """Toma muestras periódicas de la pila de un hilo y las acumula en formato 'collapsed'."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfilerMiddleware:
+    """
+    Perfila la petición con cProfile y un muestreador de pila cuando un usuario staff
+    lo pide (cabecera X-Profile o ?profile=1) o para una fracción aleatoria de peticiones
+    (HABITS_PROFILE_SAMPLE_RATE). Guarda .pstats, .collapsed (para flamegraph) y un .json
+    con los datos de la petición en HABITS_PROFILE_DIR, que conserva los últimos
+    HABITS_PROFILE_MAX_PROFILES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            if flag(request.headers.get('X-Profile')) or flag(request.GET.get('profile')):
+                return True
+        rate = getattr(settings, 'HABITS_PROFILE_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo en este proceso
+            return self.get_response(request)
+
+        interval = getattr(settings, 'HABITS_PROFILE_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL)
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            profiler.disable()
+            sampler.stop()
+
+        self.save(request, response, profiler, sampler, duration)
+        return response
+
+    def save(self, request, response, profiler, sampler, duration):
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{view.replace(':', '_')}"
+
+        profiler.dump_stats(directory / f"{name}.pstats")
+        with open(directory / f"{name}.collapsed", 'w') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        user = getattr(request, 'user', None)
+        with open(directory / f"{name}.json", 'w') as f:
+            json.dump({
+                'id': name,
+                'path': request.get_full_path(),
+                'method': request.method,
+                'view': view,
+                'user': user.get_username() if user is not None and user.is_authenticated else None,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'samples': sum(sampler.stacks.values()),
+                'created_at': timezone.now().isoformat(),
+            }, f)
+
+        prune_profiles(directory, getattr(settings, 'HABITS_PROFILE_MAX_PROFILES', DEFAULT_MAX_PROFILES))
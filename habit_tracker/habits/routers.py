@@ -0,0 +1,139 @@
+import contextvars
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+ANALYTICS_DB = 'analytics'
+# Segundos de antigüedad aceptables para la copia de análisis si no están en settings
+DEFAULT_MAX_STALENESS = 300
+
+# Hora mínima de la copia para la petición en curso; None = lecturas no marcadas
+_analytics_reads = contextvars.ContextVar('habits_analytics_reads', default=None)
+
+# Cookie firmada con la hora de la última escritura del navegador (WriteMarkerMiddleware)
+LAST_WRITE_COOKIE = 'habits_last_write'
+
+
+def snapshot_path():
+    return Path(getattr(settings, 'HABITS_ANALYTICS_SNAPSHOT', settings.BASE_DIR / 'analytics.sqlite3'))
+
+
+def max_staleness():
+    return getattr(settings, 'HABITS_ANALYTICS_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+
+
+def snapshot_taken_at():
+    """Hora en que empezó la última copia (su mtime), o None si no existe."""
+    try:
+        return os.stat(snapshot_path()).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_is_fresh(not_before=0):
+    """La copia existe, no supera la antigüedad tolerada y empezó después de `not_before`."""
+    if ANALYTICS_DB not in settings.DATABASES:
+        return False
+    taken_at = snapshot_taken_at()
+    return taken_at is not None and taken_at >= not_before and time.time() - taken_at <= max_staleness()
+
+
+def take_snapshot(path=None, using='default'):
+    """
+    Copia la base SQLite principal con la API de backup (consistente aunque haya
+    escrituras en curso) y reemplaza la copia anterior de forma atómica.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        raise ValueError('La copia de análisis solo está soportada para SQLite')
+
+    path = Path(path or snapshot_path())
+    tmp_path = path.with_name(path.name + '.tmp')
+    connection.ensure_connection()
+    started = time.time()
+    target = sqlite3.connect(tmp_path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    # La hora de la copia es la de inicio: todo lo confirmado antes está incluido
+    os.utime(tmp_path, (started, started))
+    os.replace(tmp_path, path)
+    if ANALYTICS_DB in connections:
+        # Las conexiones de este proceso siguen abiertas sobre el archivo reemplazado
+        connections[ANALYTICS_DB].close()
+    return path
+
+
+def last_write(request):
+    """Hora de la última escritura de este navegador según su cookie firmada, o 0."""
+    value = request.get_signed_cookie(LAST_WRITE_COOKIE, default=None, salt=LAST_WRITE_COOKIE)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+@contextmanager
+def analytics_reads(request=None):
+    """
+    Las lecturas dentro del bloque van a la copia de análisis si está al día. Con `request`,
+    solo si la copia es posterior a la última escritura de ese navegador: el usuario siempre
+    lee sus propios cambios.
+    """
+    token = _analytics_reads.set(last_write(request) if request is not None else 0)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
+
+
+class WriteMarkerMiddleware:
+    """
+    Anota en una cookie firmada la hora de cada petición que escribe de un usuario autenticado.
+    En una cookie y no en la sesión: no agrega un UPDATE de django_session a cada escritura.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and user is not None and user.is_authenticated:
+            # Pasada la tolerancia, toda copia al día es posterior a la escritura
+            response.set_signed_cookie(
+                LAST_WRITE_COOKIE, str(time.time()), salt=LAST_WRITE_COOKIE,
+                max_age=max_staleness(), httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class AnalyticsRouter:
+    """
+    Lecturas marcadas con analytics_reads() -> copia 'analytics'; todo lo demás, incluidas
+    todas las escrituras y las lecturas de un navegador que escribió después de la copia, a 'default'.
+    """
+
+    def db_for_read(self, model, **hints):
+        not_before = _analytics_reads.get()
+        if not_before is not None and snapshot_is_fresh(not_before):
+            return ANALYTICS_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explícito: una instancia leída de la copia debe guardarse en la principal
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ANALYTICS_DB:
+            return False
+        return None
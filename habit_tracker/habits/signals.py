@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .archive import rebuild_summaries
+from .models import Habit, HabitLog
+from .stats import apply_log_change, invalidate_stats
+
+# Campos que necesita apply_log_change
+HABIT_STATS_FIELDS = (
+    'id', 'goal_type', 'target', 'archived_until',
+    'cached_streak', 'cached_completed', 'cached_registered', 'stats_date',
+)
+
+
+def _log_habit(log):
+    if HabitLog.habit.is_cached(log):
+        return log.habit
+    return Habit.objects.only(*HABIT_STATS_FIELDS).get(pk=log.habit_id)
+
+
+@receiver(post_save, sender=Habit)
+def habit_saved(sender, instance, created, raw=False, **kwargs):
+    goal = (instance.goal_type, instance.target)
+    loaded = getattr(instance, '_loaded_goal', None)
+    if not created and not raw and loaded != goal:
+        # Con otra meta cambia qué días cuentan como completados, también en el archivo
+        if instance.archived_until:
+            rebuild_summaries(instance)
+        invalidate_stats([instance.id])
+    instance._loaded_goal = goal
+
+
+@receiver(post_save, sender=HabitLog)
+def habit_log_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_state', None)
+    after = (instance.value, instance.excluded)
+    if created:
+        apply_log_change(_log_habit(instance), instance.date, None, after)
+    elif loaded is None or loaded[0] != instance.date:
+        # Sin el estado anterior, o el registro cambió de fecha
+        since = min(loaded[0], instance.date) if loaded else None
+        invalidate_stats([instance.habit_id], since=since)
+    else:
+        apply_log_change(_log_habit(instance), instance.date, loaded[1:], after)
+    instance._loaded_state = (instance.date,) + after
+
+
+@receiver(post_delete, sender=HabitLog)
+def habit_log_deleted(sender, instance, origin=None, **kwargs):
+    # Los borrados en bloque (queryset.delete) usan invalidate_stats; los de un hábito entero no importan
+    if origin is not instance:
+        return
+    date, value, excluded = getattr(instance, '_loaded_state', (instance.date, instance.value, instance.excluded))
+    apply_log_change(_log_habit(instance), date, (value, excluded), None)
@@ -0,0 +1,201 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .models import Habit, HabitLog, HabitLogSummary
+from .timezones import group_users_by_local_date, local_today
+
+# Campos derivados que se recalculan en lote
+STATS_FIELDS = ['cached_streak', 'cached_completed', 'cached_registered', 'stats_date']
+
+
+def log_completed(habit, value, excluded=False):
+    """Indica si un valor registrado cumple la meta del hábito (misma regla que current_streak)."""
+    if excluded:
+        return False
+    try:
+        value = float(value or 0)
+    except Exception:
+        value = 0
+    if habit.goal_type == 'boolean':
+        return value >= 1
+    try:
+        target = float(habit.target or 0)
+    except Exception:
+        target = 0
+    return value >= target
+
+
+def streak_from_logs(habit, logs_by_date, today):
+    """
+    Versión en memoria de Habit.current_streak.
+    logs_by_date: {date: (value, excluded)} con a lo sumo un registro por día.
+    """
+    current_day = today if today in logs_by_date else today - timedelta(days=1)
+
+    count = 0
+    while current_day in logs_by_date:
+        value, excluded = logs_by_date[current_day]
+        if excluded:
+            current_day -= timedelta(days=1)
+            continue
+        if not log_completed(habit, value):
+            break
+        count += 1
+        current_day -= timedelta(days=1)
+    else:
+        # La racha llega a la zona archivada: seguir con los resúmenes mensuales
+        if habit.archived_until and current_day < habit.archived_until:
+            from .archive import archived_streak
+            count += archived_streak(habit, current_day)
+    return count
+
+
+def stats_from_logs(habit, logs_by_date, today, archived=(0, 0)):
+    """
+    Racha, días completados y días registrados hasta hoy (sin fechas futuras).
+    archived: (completados, registrados) de los resúmenes archivados.
+    """
+    completed, registered = archived
+    for day, (value, excluded) in logs_by_date.items():
+        if day > today:
+            continue
+        registered += 1
+        if log_completed(habit, value, excluded):
+            completed += 1
+    return {
+        'streak': streak_from_logs(habit, logs_by_date, today),
+        'completed': completed,
+        'registered': registered,
+    }
+
+
+def load_logs(habit_ids):
+    """Carga los registros de varios hábitos en una sola consulta: {habit_id: {date: (value, excluded)}}."""
+    logs = defaultdict(dict)
+    rows = (
+        HabitLog.objects.filter(habit_id__in=habit_ids)
+        .order_by('habit_id', 'date', 'id')
+        .values_list('habit_id', 'date', 'value', 'excluded')
+    )
+    for habit_id, day, value, excluded in rows.iterator(chunk_size=5000):
+        # Con duplicados gana el id más alto, igual que current_streak
+        logs[habit_id][day] = (value, excluded)
+    return logs
+
+
+def load_archived_totals(habit_ids):
+    """Suma los resúmenes archivados de varios hábitos: {habit_id: (completados, registrados)}."""
+    rows = (
+        HabitLogSummary.objects.filter(habit_id__in=habit_ids)
+        .values('habit_id')
+        .annotate(completed=Sum('completed'), registered=Sum('registered'))
+    )
+    return {row['habit_id']: (row['completed'], row['registered']) for row in rows}
+
+
+def recompute_habits(habits, today=None):
+    """
+    Recalcula los campos derivados de los hábitos dados y los guarda con bulk_update.
+    Devuelve la cantidad de hábitos actualizados.
+    """
+    today = today or local_today()
+    habits = list(habits)
+    if not habits:
+        return 0
+
+    logs = load_logs([h.id for h in habits])
+    archived = load_archived_totals([h.id for h in habits if h.archived_until])
+    for habit in habits:
+        result = stats_from_logs(habit, logs.get(habit.id, {}), today, archived.get(habit.id, (0, 0)))
+        habit.cached_streak = result['streak']
+        habit.cached_completed = result['completed']
+        habit.cached_registered = result['registered']
+        habit.stats_date = today
+
+    with transaction.atomic():
+        Habit.objects.bulk_update(habits, STATS_FIELDS, batch_size=500)
+    return len(habits)
+
+
+def recompute_users(user_ids, today=None, stale_only=False):
+    """
+    Recalcula todos los hábitos de un grupo de usuarios que comparten fecha local.
+    Con stale_only, solo los que no están calculados para `today` (p. ej. tras la medianoche).
+    """
+    today = today or local_today()
+    habits = Habit.objects.filter(user_id__in=user_ids)
+    if stale_only:
+        habits = habits.filter(Q(stats_date__isnull=True) | Q(stats_date__lt=today))
+    return recompute_habits(habits.only('id', 'goal_type', 'target', 'archived_until'), today)
+
+
+def recompute_users_by_local_date(user_ids, now=None, stale_only=False):
+    """Recalcula usuarios de distintas zonas horarias: una consulta por fecha local."""
+    total = 0
+    for today, ids in group_users_by_local_date(user_ids, now).items():
+        total += recompute_users(ids, today, stale_only)
+    return total
+
+
+def invalidate_stats(habit_ids, since=None):
+    """
+    Marca como no vigentes las estadísticas precalculadas de los hábitos dados (con `since`,
+    solo si estaban calculadas para esa fecha o una posterior). El panel las recalcula en la
+    próxima lectura y rollover_day al día siguiente.
+    Para cambios en bloque (queryset.update/delete, bulk_create) que no disparan las señales.
+    """
+    habits = Habit.objects.filter(id__in=habit_ids, stats_date__isnull=False)
+    if since is not None:
+        habits = habits.filter(stats_date__gte=since)
+    return habits.update(stats_date=None)
+
+
+def apply_log_change(habit, day, before, after):
+    """
+    Ajusta las estadísticas precalculadas al cambio del registro de `day`, sin recorrer el historial.
+    before/after: (valor, excluido) antes y después; None si el registro no existía o se borró.
+    Solo los cambios del mismo día que stats_date se aplican en el lugar; los de días anteriores
+    (o si la racha previa no se puede deducir) invalidan las estadísticas.
+    """
+    if habit.stats_date != day:
+        # Días posteriores a stats_date no cuentan todavía; anteriores sí
+        invalidate_stats([habit.id], since=day)
+        return
+
+    was_completed = before is not None and log_completed(habit, *before)
+    is_completed = after is not None and log_completed(habit, *after)
+
+    # Racha hasta ayer, deducida de la guardada y del estado anterior del día
+    if before is None or before[1]:
+        previous = habit.cached_streak
+    elif was_completed:
+        previous = habit.cached_streak - 1
+    else:
+        # Un día no completado deja la racha en 0: la anterior no se puede recuperar
+        invalidate_stats([habit.id], since=day)
+        return
+
+    if after is None or after[1]:
+        streak = previous
+    elif is_completed:
+        streak = previous + 1
+    else:
+        streak = 0
+    completed = int(is_completed) - int(was_completed)
+    registered = int(after is not None) - int(before is not None)
+
+    # Solo si nadie más tocó las estadísticas desde que se leyó el hábito
+    updated = Habit.objects.filter(id=habit.id, stats_date=day, cached_streak=habit.cached_streak).update(
+        cached_streak=streak,
+        cached_completed=F('cached_completed') + completed,
+        cached_registered=F('cached_registered') + registered,
+    )
+    if not updated:
+        invalidate_stats([habit.id], since=day)
+        return
+    habit.cached_streak = streak
+    habit.cached_completed += completed
+    habit.cached_registered += registered
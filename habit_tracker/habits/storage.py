@@ -0,0 +1,41 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete solo se generan .gz
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que además deja junto a cada archivo con hash
+    una copia .gz (y .br si está instalado brotli), para que el servidor web
+    los entregue precomprimidos sin comprimir en cada petición.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.txt', '.json', '.map')
+
+    def post_process(self, *args, **kwargs):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(*args, **kwargs):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if kwargs.get('dry_run'):
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(self.compress_extensions):
+                self._compress(hashed_name)
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+        path = self.path(name)
+        with open(path + '.gz', 'wb') as f:
+            # mtime fijo para que el resultado sea reproducible
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(content))
@@ -1,3 +1,949 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+import warnings
+from collections import Counter
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import archive_cutoff, archive_logs, restore_logs
+from .history import history_page
+from .models import ArchivedHabitLog, Habit, HabitLog, HabitLogSummary, UserProfile
+from .routers import LAST_WRITE_COOKIE, AnalyticsRouter, analytics_reads, snapshot_is_fresh, take_snapshot
+from .stats import recompute_habits, recompute_users_by_local_date, streak_from_logs
+from .timers import sweep_expired_timers, timer_finalization
+from .timezones import SESSION_KEY, get_zone, group_users_by_local_date, next_midnight
+
+# Las pruebas renderizan plantillas sin haber ejecutado collectstatic
+PLAIN_STATIC = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+# Las vistas con lecturas de análisis no deben ver la copia real (BASE_DIR/analytics.sqlite3):
+# sin copia, todo se lee de 'default'. AnalyticsRoutingTests usa la suya.
+NO_SNAPSHOT = override_settings(
+    HABITS_ANALYTICS_SNAPSHOT=Path(tempfile.gettempdir()) / 'habits-tests-sin-copia' / 'analytics.sqlite3'
+)
+
+
+class StreakParityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.today = timezone.localdate()
+
+    def assert_parity(self, habit, offsets):
+        """offsets: {días atrás: (valor, excluido)}; None deja el día sin registro."""
+        HabitLog.objects.filter(habit=habit).delete()
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habit, date=self.today - timedelta(days=offset), value=value, excluded=excluded)
+            for offset, (value, excluded) in offsets.items()
+        ])
+        logs = {self.today - timedelta(days=offset): entry for offset, entry in offsets.items()}
+        habit.stats_date = None
+        self.assertEqual(streak_from_logs(habit, logs, self.today), habit.current_streak, offsets)
+
+    def test_streak_from_logs_matches_current_streak(self):
+        numeric = Habit.objects.create(user=self.user, name='Leer', goal_type='numeric', target=2)
+        boolean = Habit.objects.create(user=self.user, name='Correr', goal_type='boolean')
+        done, missed, excluded = (3, False), (1, False), (0, True)
+        cases = [
+            {},
+            {0: done, 1: done, 2: done},
+            {1: done, 2: done, 4: done},                 # hoy sin registro, hueco en 3
+            {0: missed, 1: done, 2: done},               # hoy no completado
+            {0: excluded, 1: done, 2: excluded, 3: done, 4: missed},
+            {0: excluded, 1: excluded},
+            {1: excluded, 2: done, 3: done, 5: done},    # excluido y luego hueco
+            {0: done, 1: missed, 2: done},
+            {-1: done, 0: done, 1: done},                # registro futuro
+        ]
+        for offsets in cases:
+            self.assert_parity(numeric, offsets)
+            self.assert_parity(boolean, offsets)
+
+
+class RecomputeStatsTests(TransactionTestCase):
+    # Los procesos del pool leen y escriben la base de pruebas: no puede haber transacción abierta
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.habits = []
+        for i in range(4):
+            user = User.objects.create_user(f'usuario{i}', password='clave-segura-123')
+            habit = Habit.objects.create(user=user, name='Leer', goal_type='numeric', target=2)
+            # Usuario i: racha de i + 1 días, el último registro hace 10 * i días
+            start = 10 * i
+            HabitLog.objects.bulk_create([
+                HabitLog(habit=habit, date=self.today - timedelta(days=start + offset), value=3)
+                for offset in range(i + 1)
+            ])
+            self.habits.append(habit)
+
+    def expected(self, habit):
+        habit.stats_date = None
+        return habit.current_streak, habit.habitlog_set.count()
+
+    def test_pool_recomputes_every_chunk(self):
+        out = StringIO()
+        call_command('recompute_stats', workers=2, chunk_size=1, stdout=out)
+        self.assertIn('Bloque 4/4', out.getvalue())
+        self.assertIn('Listo: 4 hábitos', out.getvalue())
+
+        for habit in self.habits:
+            habit.refresh_from_db()
+            self.assertEqual(habit.stats_date, self.today)
+            self.assertEqual((habit.cached_streak, habit.cached_registered), self.expected(habit))
+
+    def test_since_limits_recompute_to_recent_users(self):
+        since = self.today - timedelta(days=15)
+        out = StringIO()
+        call_command('recompute_stats', workers=1, since=since.isoformat(), stdout=out)
+        self.assertIn('RECALCULANDO 2 USUARIOS', out.getvalue())
+        self.assertEqual(
+            list(Habit.objects.order_by('id').values_list('stats_date', flat=True)),
+            [self.today, self.today, None, None],
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('recompute_stats', since='ayer', stdout=StringIO())
+
+
+class TimerSweepTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.now = timezone.now()
+        self.habit = Habit.objects.create(
+            user=self.user, name='Meditar', goal_type='time', target=30,
+            timer_state='running', timer_started_at=self.now - timedelta(minutes=25), accumulated_time=10 * 60,
+        )
+
+    def test_timer_is_closed_at_its_target(self):
+        # 10 minutos acumulados + 25 en marcha: la meta de 30 se cumplió hace 5 minutos
+        self.assertEqual(sweep_expired_timers(self.now), 1)
+        log = HabitLog.objects.get(habit=self.habit)
+        self.assertEqual(log.date, timezone.localdate(self.habit.timer_started_at))
+        self.assertAlmostEqual(log.value, 30)
+
+        self.habit.refresh_from_db()
+        self.assertEqual((self.habit.timer_state, self.habit.timer_started_at, self.habit.accumulated_time), ('stopped', None, 0.0))
+        self.assertEqual(sweep_expired_timers(self.now), 0)
+
+    def test_running_timer_below_target_is_left_alone(self):
+        self.assertEqual(sweep_expired_timers(self.now - timedelta(minutes=10)), 0)
+        self.assertFalse(HabitLog.objects.exists())
+        self.assertEqual(Habit.objects.get().timer_state, 'running')
+
+    def test_timer_restarted_during_sweep_is_not_overwritten(self):
+        other = Habit.objects.create(
+            user=self.user, name='Leer', goal_type='time', target=30,
+            timer_state='running', timer_started_at=self.now - timedelta(minutes=40),
+        )
+        restarted_at = self.now - timedelta(seconds=5)
+
+        def restart_then_finalize(habit, now, zone=None):
+            # El usuario detiene, registra y vuelve a iniciar entre la lectura y la escritura del barrido
+            if habit.id == self.habit.id:
+                HabitLog.objects.create(habit=self.habit, date=timezone.localdate(now), value=12)
+                Habit.objects.filter(id=habit.id).update(timer_started_at=restarted_at, accumulated_time=0.0)
+            return timer_finalization(habit, now, zone)
+
+        with mock.patch('habits.timers.timer_finalization', restart_then_finalize):
+            self.assertEqual(sweep_expired_timers(self.now), 1)
+        # El temporizador reiniciado queda como lo dejó el usuario
+        self.habit.refresh_from_db()
+        self.assertEqual((self.habit.timer_state, self.habit.timer_started_at), ('running', restarted_at))
+        self.assertEqual(list(HabitLog.objects.filter(habit=self.habit).values_list('value', flat=True)), [12])
+        # Los demás se cierran igual
+        self.assertAlmostEqual(HabitLog.objects.get(habit=other).value, 30)
+        self.assertEqual(Habit.objects.get(id=other.id).timer_state, 'stopped')
+
+
+@PLAIN_STATIC
+class StatsInvalidationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.today = timezone.localdate()
+        self.habit = Habit.objects.create(user=self.admin, name='Leer', goal_type='numeric', target=2)
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, date=self.today - timedelta(days=offset), value=3) for offset in range(1, 6)
+        ])
+        recompute_habits([self.habit])
+        self.client.force_login(self.admin)
+
+    def cached(self):
+        self.habit.refresh_from_db()
+        return self.habit.stats_date, self.habit.cached_streak, self.habit.cached_completed, self.habit.cached_registered
+
+    def live(self):
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.stats_date = None
+        return habit.current_streak
+
+    def log(self, value):
+        self.client.post(reverse('log_habit', args=[self.habit.id]), {'value': value})
+
+    def test_todays_log_updates_counters_in_place(self):
+        self.assertEqual(self.cached(), (self.today, 5, 5, 5))
+
+        # Sin recorrer el historial: solo la actualización del hábito
+        with CaptureQueriesContext(connection) as queries:
+            self.log('3')
+        self.assertFalse(any('habits_habitlog"."date" <' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(self.cached(), (self.today, 6, 6, 6))
+
+        self.client.post(reverse('exclude_day', args=[self.habit.id]))
+        self.assertEqual(self.cached(), (self.today, 5, 5, 6))
+
+        # Reactivar el día excluido borra el registro
+        self.log('0')
+        self.assertEqual(self.cached(), (self.today, 5, 5, 5))
+
+        self.log('1')
+        self.assertEqual(self.cached(), (self.today, 0, 5, 6))
+        self.assertEqual(self.live(), 0)
+
+        # Después de un día no completado la racha previa no se deduce: se invalida y el panel recalcula
+        self.log('2')
+        self.assertIsNone(self.cached()[0])
+        self.client.get(reverse('habit_list'))
+        self.assertEqual(self.cached(), (self.today, 6, 6, 6))
+
+    def test_admin_and_shell_edits_invalidate_stats(self):
+        log = HabitLog.objects.get(habit=self.habit, date=self.today - timedelta(days=2))
+        url = reverse('admin:habits_habitlog_change', args=[log.id])
+        self.client.post(url, {'habit': self.habit.id, 'date': log.date.isoformat(), 'value': '0'})
+        self.assertIsNone(self.cached()[0])
+        self.assertEqual(self.live(), 1)
+        self.assertEqual(self.client.get(reverse('habit_list')).context['habits'][0].current_streak, 1)
+
+        self.client.post(reverse('admin:habits_habitlog_changelist'), {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': list(HabitLog.objects.values_list('id', flat=True)),
+        })
+        self.assertIsNone(self.cached()[0])
+        self.assertEqual(self.client.get(reverse('habit_list')).context['habits'][0].current_streak, 0)
+
+        recompute_habits([self.habit])
+        HabitLog.objects.create(habit=self.habit, date=self.today - timedelta(days=1), value=3)
+        self.assertIsNone(self.cached()[0])
+
+        recompute_habits([self.habit])
+        Habit.objects.get(pk=self.habit.pk).habitlog_set.get().delete()
+        self.assertIsNone(self.cached()[0])
+
+    def test_goal_change_invalidates_stats(self):
+        self.client.post(reverse('habit_edit', args=[self.habit.id]), {'name': 'Leer', 'goal_type': 'numeric', 'target': '4'})
+        self.assertIsNone(self.cached()[0])
+        self.client.get(reverse('habit_list'))
+        self.assertEqual(self.cached(), (self.today, 0, 0, 5))
+
+
+@PLAIN_STATIC
+class RolloverTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.today = timezone.localdate()
+        yesterday = self.today - timedelta(days=1)
+
+        self.stale = Habit.objects.create(user=self.user, name='Leer', stats_date=yesterday, cached_streak=9)
+        HabitLog.objects.create(habit=self.stale, date=yesterday, value=1)
+        # Ya calculado para hoy: rollover_day no lo toca (valores a propósito distintos de los reales)
+        self.fresh = Habit.objects.create(user=self.user, name='Correr', stats_date=self.today, cached_streak=7)
+        self.timer = Habit.objects.create(
+            user=self.user, name='Meditar', goal_type='time', target=10, stats_date=yesterday,
+            timer_state='running', timer_started_at=timezone.now() - timedelta(minutes=15),
+        )
+
+    def test_rollover_closes_timers_and_recomputes_stale_habits(self):
+        out = StringIO()
+        call_command('rollover_day', workers=1, stdout=out)
+        self.assertIn('Temporizadores cerrados: 1', out.getvalue())
+
+        self.stale.refresh_from_db()
+        self.assertEqual((self.stale.stats_date, self.stale.cached_streak, self.stale.cached_registered), (self.today, 1, 1))
+        self.fresh.refresh_from_db()
+        self.assertEqual(self.fresh.cached_streak, 7)
+
+        self.timer.refresh_from_db()
+        self.assertEqual((self.timer.timer_state, self.timer.timer_started_at), ('stopped', None))
+        self.assertAlmostEqual(HabitLog.objects.get(habit=self.timer).value, 10)
+        self.assertEqual((self.timer.stats_date, self.timer.cached_completed), (self.today, 1))
+
+        # Estimaciones de filas para el admin
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tbl FROM sqlite_stat1 WHERE tbl = 'habits_habitlog'")
+            self.assertIsNotNone(cursor.fetchone())
+            # ANALYZE acotado: no recorre índices completos
+            cursor.execute("PRAGMA analysis_limit")
+            self.assertEqual(cursor.fetchone()[0], settings.HABITS_ANALYSIS_LIMIT)
+
+
+@PLAIN_STATIC
+@NO_SNAPSHOT
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.today = timezone.localdate()
+
+        # Racha larga que cruza el horizonte de archivo, con días excluidos y un fallo antiguo
+        self.long = Habit.objects.create(user=self.user, name='Leer', goal_type='numeric', target=2)
+        logs = []
+        for offset in range(1, 500):
+            day = self.today - timedelta(days=offset)
+            if offset == 420:
+                logs.append(HabitLog(habit=self.long, date=day, value=1))
+            elif offset % 17 == 0:
+                logs.append(HabitLog(habit=self.long, date=day, excluded=True))
+            else:
+                logs.append(HabitLog(habit=self.long, date=day, value=3))
+
+        # Historial con huecos
+        self.gaps = Habit.objects.create(user=self.user, name='Correr', goal_type='boolean')
+        for offset in range(0, 400, 3):
+            logs.append(HabitLog(habit=self.gaps, date=self.today - timedelta(days=offset), value=offset % 2))
+        HabitLog.objects.bulk_create(logs)
+
+        self.client.force_login(self.user)
+
+    def snapshot(self):
+        habits = list(Habit.objects.filter(user=self.user).order_by('name'))
+        for habit in habits:
+            habit.stats_date = None
+        streaks = [h.current_streak for h in habits]
+
+        Habit.objects.filter(user=self.user).update(stats_date=None)
+        stats = [
+            (s['habit'].id, s['total_registros'], s['completados'], s['tasa_exito'], s['current_streak'])
+            for s in self.client.get(reverse('statistics')).context['stats']
+        ]
+
+        recompute_habits(Habit.objects.filter(user=self.user))
+        cached = list(
+            Habit.objects.filter(user=self.user).order_by('name')
+            .values_list('cached_streak', 'cached_completed', 'cached_registered')
+        )
+        return streaks, stats, cached
+
+    def test_stats_identical_after_archive_and_restore(self):
+        before = self.snapshot()
+        self.assertEqual(before[0][1], 419 - 419 // 17)
+
+        archived = archive_logs(archive_cutoff(self.today, days=30))
+        self.assertGreater(archived, 0)
+        self.assertEqual(ArchivedHabitLog.objects.count(), archived)
+        self.assertFalse(HabitLog.objects.filter(date__lt=archive_cutoff(self.today, days=30)).exists())
+        self.assertTrue(HabitLogSummary.objects.exists())
+        self.assertEqual(self.snapshot(), before)
+
+        self.assertEqual(restore_logs(), (archived, 0))
+        self.assertFalse(HabitLogSummary.objects.exists())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_restore_keeps_logs_written_after_archiving(self):
+        cutoff = archive_cutoff(self.today, days=60)
+        archive_logs(cutoff)
+        day = cutoff - timedelta(days=3)
+        HabitLog.objects.create(habit=self.long, date=day, value=9)
+
+        out = StringIO()
+        call_command('archive_logs', restore=True, stdout=out)
+        self.assertIn('descartados (el día ya tenía registro en HabitLog): 1', out.getvalue())
+        self.assertEqual(HabitLog.objects.get(habit=self.long, date=day).value, 9)
+        self.assertFalse(ArchivedHabitLog.objects.exists())
+        self.assertEqual(HabitLog.objects.filter(habit=self.long).count(), 499)
+
+    def test_goal_change_after_archive_rebuilds_summaries(self):
+        cutoff = archive_cutoff(self.today, days=30)
+        for target in ('4', '1'):
+            archive_logs(cutoff)
+            self.client.post(reverse('habit_edit', args=[self.long.id]), {'name': 'Leer', 'goal_type': 'numeric', 'target': target})
+            archived = self.snapshot()
+            restore_logs()
+            self.assertEqual(archived, self.snapshot(), target)
+
+
+@PLAIN_STATIC
+@NO_SNAPSHOT
+class HistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.today = timezone.localdate()
+        self.habit = Habit.objects.create(user=self.user, name='Leer', goal_type='numeric', target=2)
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, date=self.today - timedelta(days=offset), value=offset % 4, excluded=offset % 5 == 0)
+            for offset in range(200)
+        ])
+        self.client.force_login(self.user)
+
+    def pages(self, **params):
+        dates = []
+        cursor = None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            data = self.client.get(reverse('habit_history_json', args=[self.habit.id]), query).json()
+            dates.extend(row['date'] for row in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return dates
+
+    def test_keyset_pages_cover_history_once(self):
+        expected = [(self.today - timedelta(days=offset)).isoformat() for offset in range(200)]
+        self.assertEqual(self.pages(), expected)
+
+        # Igual después de archivar parte del historial
+        archive_logs(archive_cutoff(self.today, days=60))
+        self.assertEqual(self.pages(), expected)
+
+    def test_filters(self):
+        start = self.today - timedelta(days=20)
+        excluded = self.pages(status='excluded', start=start.isoformat())
+        self.assertEqual(len(excluded), 5)
+
+        response = self.client.get(reverse('habit_history_csv', args=[self.habit.id]), {'status': 'completed'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'fecha,valor,excluido,estado')
+        self.assertTrue(all(line.endswith(',completed') for line in lines[1:]))
+        self.assertEqual(len(lines) - 1, HabitLog.objects.filter(habit=self.habit, excluded=False, value__gte=2).count())
+
+    def test_invalid_filters_are_rejected_not_dropped(self):
+        params = {'start': (self.today - timedelta(days=10)).isoformat(), 'status': 'bogus'}
+        response = self.client.get(reverse('habit_history_json', args=[self.habit.id]), params)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+        self.assertEqual(self.client.get(reverse('habit_history_csv', args=[self.habit.id]), params).status_code, 400)
+
+        # La página HTML muestra el error y conserva los filtros válidos
+        response = self.client.get(reverse('habit_history', args=[self.habit.id]), params)
+        self.assertEqual(len(response.context['logs']), 11)
+        self.assertTrue(response.context['form'].errors)
+
+    def test_invalid_cursor_is_rejected_not_restarted(self):
+        # Un cursor antiguo 'fecha_id' no vuelve a la primera página (el cliente duplicaría filas)
+        params = {'cursor': f'{self.today.isoformat()}_55'}
+        response = self.client.get(reverse('habit_history_json', args=[self.habit.id]), params)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.json()['errors'])
+        self.assertEqual(self.client.get(reverse('habit_history_csv', args=[self.habit.id]), params).status_code, 400)
+        with self.assertRaises(ValueError):
+            history_page(self.habit, {}, params['cursor'])
+
+        response = self.client.get(reverse('habit_history', args=[self.habit.id]), params)
+        self.assertContains(response, 'Cursor de paginación inválido')
+
+    def test_cursor_is_an_index_range_bound(self):
+        cursor = (self.today - timedelta(days=150)).isoformat()
+        with CaptureQueriesContext(connection) as queries:
+            rows, _ = history_page(self.habit, {}, cursor)
+        self.assertEqual(rows[0]['date'], self.today - timedelta(days=151))
+
+        sql = next(q['sql'] for q in queries.captured_queries if 'habits_habitlog' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        # Búsqueda por rango en el índice único (habit_id, date), sin recorrer las filas más nuevas ni ordenar aparte
+        self.assertIn('habit_id=? AND date<?', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_html_page_links_next_cursor(self):
+        response = self.client.get(reverse('habit_history', args=[self.habit.id]), {'status': 'missed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['logs']), 30)
+        self.assertContains(response, f"status=missed&cursor={response.context['next_cursor']}")
+
+    def test_other_users_habit_is_not_found(self):
+        other = User.objects.create_user('beto', password='clave-segura-123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('habit_history', args=[self.habit.id])).status_code, 404)
+
+
+@PLAIN_STATIC
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.today = timezone.localdate()
+        self.client.force_login(self.admin)
+        # La primera petición guarda la zona horaria en la sesión
+        self.client.get(reverse('admin:index'))
+
+    def create_logs(self, habits, days):
+        created = []
+        for i in range(habits):
+            habit = Habit.objects.create(user=self.admin, name=f'Hábito {i}')
+            created.append(habit)
+            HabitLog.objects.bulk_create([
+                HabitLog(habit=habit, date=self.today - timedelta(days=offset), value=1) for offset in range(days)
+            ])
+        return created
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_change_view_loads_the_habit_once_and_protects_derived_fields(self):
+        habit = Habit.objects.create(user=self.admin, name='Leer', goal_type='numeric', target=2)
+        url = reverse('admin:habits_habit_change', args=[habit.id])
+        # Sin columnas diferidas cargadas de a una
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(sum('FROM "habits_habit"' in q['sql'] for q in queries.captured_queries), 1)
+
+        self.client.post(url, {
+            'user': self.admin.id, 'name': 'Leer', 'goal_type': 'numeric', 'target': 2,
+            'cached_streak': 99, 'stats_date': self.today.isoformat(), 'archived_until': self.today.isoformat(),
+        })
+        habit.refresh_from_db()
+        self.assertEqual((habit.cached_streak, habit.stats_date, habit.archived_until), (0, None, None))
+
+    def test_habit_autocomplete_is_ordered(self):
+        self.create_logs(3, 1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            response = self.client.get(reverse('admin:autocomplete'), {
+                'app_label': 'habits', 'model_name': 'habitlog', 'field_name': 'habit', 'term': 'Hábito',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        urls = [reverse('admin:habits_habitlog_changelist'), reverse('admin:habits_habit_changelist')]
+        self.create_logs(2, 3)
+        few = [self.changelist_queries(url) for url in urls]
+        self.create_logs(20, 30)
+        self.assertEqual([self.changelist_queries(url) for url in urls], few)
+
+    def test_bulk_actions_are_set_based(self):
+        habits = self.create_logs(3, 5)
+        HabitLog.objects.create(habit=habits[0], date=self.today + timedelta(days=2), value=1)
+        url = reverse('admin:habits_habitlog_changelist')
+
+        def exclude(ids):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(url, {'action': 'exclude_logs', '_selected_action': ids})
+            # El orden por defecto del admin no debe colarse en el DISTINCT de hábitos
+            distinct = next(q['sql'] for q in queries.captured_queries if 'DISTINCT' in q['sql'])
+            self.assertNotIn('ORDER BY', distinct)
+            return len(queries)
+
+        few = exclude(list(HabitLog.objects.filter(date=self.today).values_list('id', flat=True)))
+        self.assertEqual(HabitLog.objects.filter(excluded=True).count(), 3)
+        many = exclude(list(HabitLog.objects.filter(date__lt=self.today).values_list('id', flat=True)))
+        self.assertEqual(HabitLog.objects.filter(excluded=True).count(), 15)
+        # Las consultas no crecen con la cantidad de registros seleccionados
+        self.assertEqual(many, few)
+
+        habit_url = reverse('admin:habits_habit_changelist')
+        self.client.post(habit_url, {'action': 'delete_future_logs', '_selected_action': [h.id for h in habits]})
+        self.assertFalse(HabitLog.objects.filter(date__gt=self.today).exists())
+
+    def test_paginator_uses_estimate_without_filters(self):
+        from .admin import EstimatedCountPaginator
+        self.create_logs(2, 10)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        paginator = EstimatedCountPaginator(HabitLog.objects.order_by('id'), 10)
+        paginator.estimate_threshold = 1
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 20)
+        self.assertNotIn('COUNT', queries[0]['sql'].upper())
+
+        filtered = EstimatedCountPaginator(HabitLog.objects.filter(value=1).order_by('id'), 10)
+        filtered.estimate_threshold = 1
+        self.assertEqual(filtered.count, 20)
+
+
+class StaticFilesTests(TestCase):
+    def test_collectstatic_writes_hashed_and_compressed_bundles(self):
+        import gzip
+        import tempfile
+        from pathlib import Path
+
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('js/habit_list.js')
+            self.assertRegex(hashed, r'^js/habit_list\.[0-9a-f]{12}\.js$')
+            path = Path(root) / hashed
+            self.assertEqual(gzip.decompress((Path(root) / (hashed + '.gz')).read_bytes()), path.read_bytes())
+
+    def test_dashboard_bytes_counts_hashed_bundles(self):
+        user = User.objects.create_user('ana', password='clave-segura-123')
+        Habit.objects.create(user=user, name='Leer')
+
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            out = StringIO()
+            call_command('dashboard_bytes', user='ana', stdout=out)
+        # Con DEBUG=False las URLs tienen hash y los bundles se cuentan en la primera visita
+        self.assertRegex(out.getvalue(), r'/static/js/habit_list\.[0-9a-f]{12}\.js: \d+ bytes')
+        self.assertNotIn('sin hash', out.getvalue())
+
+    @PLAIN_STATIC
+    def test_dashboard_is_gzipped_and_loads_external_bundles(self):
+        user = User.objects.create_user('ana', password='clave-segura-123')
+        Habit.objects.create(user=user, name='Leer')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('habit_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        html = self.client.get(reverse('habit_list')).content.decode()
+        self.assertIn('js/habit_list.js', html)
+        self.assertNotIn('<style>', html.split('</head>')[0])
+        self.assertNotIn('class TimerManager', html)
+
+
+@PLAIN_STATIC
+@NO_SNAPSHOT
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        Habit.objects.create(user=self.user, name='Leer')
+
+    def profiles(self):
+        return sorted(p.suffix for p in Path(self.directory.name).iterdir())
+
+    def test_staff_can_request_a_profile(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        with self.settings(HABITS_PROFILE_DIR=self.directory.name):
+            self.client.get(reverse('habit_list'), {'profile': '1'})
+            self.assertEqual(self.profiles(), ['.collapsed', '.json', '.pstats'])
+
+            out = StringIO()
+            call_command('list_profiles', stdout=out)
+            self.assertIn('GET /?profile=1', out.getvalue())
+
+    def test_profile_flag_must_be_truthy(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        with self.settings(HABITS_PROFILE_DIR=self.directory.name):
+            self.client.get(reverse('habit_list'), {'profile': '0'})
+            self.client.get(reverse('habit_list'), HTTP_X_PROFILE='false')
+            self.assertEqual(self.profiles(), [])
+            self.client.get(reverse('habit_list'), HTTP_X_PROFILE='true')
+            self.assertEqual(len(self.profiles()), 3)
+
+    def test_old_profiles_are_pruned(self):
+        self.client.force_login(self.user)
+        with self.settings(HABITS_PROFILE_DIR=self.directory.name, HABITS_PROFILE_SAMPLE_RATE=1.0,
+                           HABITS_PROFILE_MAX_PROFILES=2):
+            for _ in range(4):
+                self.client.get(reverse('habit_list'))
+        self.assertEqual(self.profiles(), ['.collapsed', '.collapsed', '.json', '.json', '.pstats', '.pstats'])
+
+    def test_regular_users_are_not_profiled(self):
+        self.client.force_login(self.user)
+        with self.settings(HABITS_PROFILE_DIR=self.directory.name):
+            self.client.get(reverse('habit_list'), {'profile': '1'}, HTTP_X_PROFILE='1')
+        self.assertEqual(self.profiles(), [])
+
+    def test_sampled_requests_are_profiled(self):
+        self.client.force_login(self.user)
+        with self.settings(HABITS_PROFILE_DIR=self.directory.name, HABITS_PROFILE_SAMPLE_RATE=1.0):
+            self.client.get(reverse('statistics'))
+        self.assertEqual(self.profiles(), ['.collapsed', '.json', '.pstats'])
+
+
+@PLAIN_STATIC
+class AnalyticsRoutingTests(TransactionTestCase):
+    # Sin transacción envolvente: la API de backup no copia una base con escrituras pendientes,
+    # y los hilos de la prueba concurrente usan cada uno su conexión
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        # La copia va al archivo que abre el alias 'analytics' en las pruebas (TEST NAME)
+        self.snapshot = Path(connections['analytics'].settings_dict['NAME'])
+        connections['analytics'].close()
+        self.snapshot.unlink(missing_ok=True)
+        override = self.settings(HABITS_ANALYTICS_SNAPSHOT=self.snapshot)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user('ana', password='clave-segura-123')
+        self.habit = Habit.objects.create(user=self.user, name='Leer')
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, date=timezone.localdate() - timedelta(days=offset), value=1)
+            for offset in range(1, 201)
+        ])
+
+    def reads(self, client, url):
+        """Respuesta y {alias: consultas a habits_habitlog} de una petición."""
+        counts = Counter()
+
+        def count(alias):
+            def wrapper(execute, sql, params, many, context):
+                if 'habits_habitlog' in sql:
+                    counts[alias] += 1
+                return execute(sql, params, many, context)
+            return wrapper
+
+        with connections['default'].execute_wrapper(count('default')), \
+                connections['analytics'].execute_wrapper(count('analytics')):
+            response = client.get(url)
+        return response, counts
+
+    def stats_for(self, response, habit):
+        return next(s for s in response.context['stats'] if s['habit'].id == habit.id)
+
+    def test_only_marked_reads_use_a_fresh_snapshot(self):
+        router = AnalyticsRouter()
+        self.assertIsNone(router.db_for_read(HabitLog))
+        with analytics_reads():
+            # Sin copia todavía: se lee de la principal
+            self.assertIsNone(router.db_for_read(HabitLog))
+            take_snapshot()
+            self.assertEqual(router.db_for_read(HabitLog), 'analytics')
+            self.assertEqual(router.db_for_write(HabitLog), 'default')
+            with self.settings(HABITS_ANALYTICS_MAX_STALENESS=-1):
+                self.assertIsNone(router.db_for_read(HabitLog))
+        self.assertIsNone(router.db_for_read(HabitLog))
+
+        # Un navegador que escribió después de la copia lee de la principal
+        marker = HttpResponse()
+        marker.set_signed_cookie(LAST_WRITE_COOKIE, str(time.time() + 1), salt=LAST_WRITE_COOKIE)
+        request = RequestFactory().get('/')
+        request.COOKIES[LAST_WRITE_COOKIE] = marker.cookies[LAST_WRITE_COOKIE].value
+        with analytics_reads(request):
+            self.assertIsNone(router.db_for_read(HabitLog))
+        # Una cookie alterada no cuenta
+        request.COOKIES[LAST_WRITE_COOKIE] = str(time.time() + 1)
+        with analytics_reads(request):
+            self.assertEqual(router.db_for_read(HabitLog), 'analytics')
+
+    def test_write_marker_does_not_write_the_session(self):
+        self.client.force_login(self.user)
+        # La primera petición guarda la zona horaria en la sesión
+        self.client.get(reverse('habit_list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('log_habit', args=[self.habit.id]), {'value': '1'})
+        self.assertFalse(any('UPDATE "django_session"' in q['sql'] for q in queries.captured_queries))
+        self.assertIn(LAST_WRITE_COOKIE, self.client.cookies)
+
+    def test_statistics_aggregates_from_snapshot_until_the_user_writes(self):
+        self.client.force_login(self.user)
+        take_snapshot()
+        response, counts = self.reads(self.client, reverse('statistics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(counts['analytics'], 0)
+        self.assertEqual(counts['default'], 0)
+
+        # Después de escribir, sus lecturas van a la principal hasta que haya una copia más nueva
+        self.client.post(reverse('log_habit', args=[self.habit.id]), {'value': '1'})
+        Habit.objects.update(stats_date=None)
+        response, counts = self.reads(self.client, reverse('statistics'))
+        self.assertEqual(counts['analytics'], 0)
+        self.assertEqual(self.stats_for(response, self.habit)['total_registros'], 201)
+
+        take_snapshot()
+        response, counts = self.reads(self.client, reverse('statistics'))
+        self.assertGreater(counts['analytics'], 0)
+        self.assertEqual(self.stats_for(response, self.habit)['total_registros'], 201)
+
+    def test_stale_snapshot_does_not_hide_new_habits(self):
+        take_snapshot()
+        self.client.force_login(self.user)
+        self.client.post(reverse('habit_create'), {'name': 'Correr', 'goal_type': 'boolean', 'target': '1'})
+        habit = Habit.objects.get(name='Correr')
+        self.client.post(reverse('log_habit', args=[habit.id]), {'value': '1'})
+
+        # La copia sigue al día (dentro de la tolerancia) pero no tiene el hábito ni su registro
+        with self.settings(HABITS_ANALYTICS_SNAPSHOT=self.snapshot):
+            self.assertTrue(snapshot_is_fresh())
+        self.assertFalse(Habit.objects.using('analytics').filter(id=habit.id).exists())
+
+        self.assertEqual(self.client.get(reverse('habit_history', args=[habit.id])).status_code, 200)
+        self.assertEqual(len(self.client.get(reverse('habit_history_json', args=[habit.id])).json()['results']), 1)
+        self.assertEqual(self.stats_for(self.client.get(reverse('statistics')), habit)['completados'], 1)
+
+        # Otra sesión del mismo usuario, sin escrituras propias: lee la copia, pero el hábito existe
+        other = Client()
+        other.force_login(self.user)
+        Habit.objects.filter(id=habit.id).update(stats_date=None)
+        response, counts = self.reads(other, reverse('habit_history', args=[habit.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(counts['analytics'], 0)
+        self.assertEqual(self.stats_for(other.get(reverse('statistics')), habit)['total_registros'], 0)
+
+    def write_p95(self, writer, writes=30):
+        latencies = []
+        for i in range(writes):
+            start = time.perf_counter()
+            response = writer.post(reverse('log_habit', args=[self.habit.id]), {'value': str(i % 2)})
+            latencies.append(time.perf_counter() - start)
+            self.assertEqual(response.status_code, 302)
+        latencies.sort()
+        return latencies[int(len(latencies) * 0.95) - 1]
+
+    def write_p95_under_reads(self, writer, readers):
+        """p95 de las escrituras de `writer` mientras `readers` piden estadísticas; y las consultas de los lectores."""
+        stop = threading.Event()
+        errors = []
+        counts = []
+
+        def read(client):
+            try:
+                while not stop.is_set():
+                    response, reads = self.reads(client, reverse('statistics'))
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+                    counts.append(reads)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=read, args=(reader,)) for reader in readers]
+        for thread in threads:
+            thread.start()
+        try:
+            p95 = self.write_p95(writer)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        return p95, counts
+
+    def test_log_writes_under_concurrent_statistics(self):
+        take_snapshot()
+        Habit.objects.update(stats_date=None)
+        clients = []
+        for _ in range(4):
+            client = Client()
+            client.force_login(self.user)
+            # La primera petición guarda la zona horaria en la sesión; después los lectores no escriben
+            client.get(reverse('statistics'))
+            clients.append(client)
+        writer, readers = clients[0], clients[1:]
+
+        baseline = self.write_p95(writer)
+        with self.settings(HABITS_ANALYTICS_SNAPSHOT=self.snapshot.with_name('sin-copia.sqlite3')):
+            primary, counts = self.write_p95_under_reads(writer, readers)
+        self.assertGreater(sum(c['default'] for c in counts), 0)
+        loaded, counts = self.write_p95_under_reads(writer, readers)
+        # Los agregados de las lecturas concurrentes no tocaron la base principal
+        self.assertGreater(sum(c['analytics'] for c in counts), 0)
+        self.assertEqual(sum(c['default'] for c in counts), 0)
+
+        # Proporciones y no tiempos fijos. Los lectores comparten CPU (y el GIL) con el escritor, así
+        # que la línea base sin lecturas solo acota esperas patológicas (busy timeout de 5 s); la misma
+        # carga contra la principal aísla lo que cuestan los bloqueos de lectura
+        detail = (
+            f'p95 de escritura: {baseline * 1000:.1f} ms sin lecturas, {primary * 1000:.1f} ms leyendo '
+            f'de la principal, {loaded * 1000:.1f} ms leyendo de la copia'
+        )
+        self.assertLess(loaded / baseline, 15, detail)
+        self.assertLess(loaded / primary, 1.5, detail)
+
+
+@PLAIN_STATIC
+class UserTimezoneTests(TestCase):
+    # 12:00 UTC: ya es 2 de enero en Kiritimati (UTC+14) y sigue siendo 1 de enero en el resto
+    NOW = datetime(2026, 1, 1, 12, 0, tzinfo=get_zone('UTC'))
+
+    def create_user(self, username, zone=None):
+        user = User.objects.create_user(username, password='clave-segura-123')
+        if zone:
+            UserProfile.objects.create(user=user, timezone=zone)
+        return user
+
+    def test_dashboard_uses_the_users_local_date(self):
+        user = self.create_user('ana', 'Pacific/Kiritimati')
+        Habit.objects.create(user=user, name='Leer')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('habit_list'))
+        expected = timezone.localtime(timezone.now(), get_zone('Pacific/Kiritimati')).date()
+        self.assertEqual(response.context['today'], expected)
+        self.assertEqual(self.client.session[SESSION_KEY], 'Pacific/Kiritimati')
+
+        # Con la zona ya en la sesión no se vuelve a consultar el perfil
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('habit_list'))
+        self.assertFalse(any('habits_userprofile' in q['sql'] for q in queries.captured_queries))
+
+    def test_countdown_targets_the_users_midnight(self):
+        user = self.create_user('ana', 'Asia/Tokyo')
+        Habit.objects.create(user=user, name='Leer')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('habit_list'))
+        midnight = next_midnight(get_zone('Asia/Tokyo'))
+        self.assertEqual(response.context['midnight_epoch'], int(midnight.timestamp()))
+        self.assertContains(response, f'data-midnight="{int(midnight.timestamp())}"')
+
+    def test_settings_page_updates_timezone(self):
+        user = self.create_user('ana')
+        self.client.force_login(user)
+        self.client.post(reverse('user_settings'), {'timezone': 'Asia/Tokyo'})
+        self.assertEqual(UserProfile.objects.get(user=user).timezone, 'Asia/Tokyo')
+        self.assertEqual(self.client.session[SESSION_KEY], 'Asia/Tokyo')
+
+    def test_users_are_grouped_by_local_date_in_one_query(self):
+        ahead = self.create_user('ana', 'Pacific/Kiritimati')
+        behind = self.create_user('beto', 'Pacific/Pago_Pago')
+        tokyo = self.create_user('carla', 'Asia/Tokyo')
+        default = self.create_user('dani')
+
+        with self.assertNumQueries(1):
+            groups = group_users_by_local_date([ahead.id, behind.id, tokyo.id, default.id], self.NOW)
+        self.assertEqual(dict(groups), {
+            datetime(2026, 1, 2).date(): [ahead.id],
+            datetime(2026, 1, 1).date(): [behind.id, tokyo.id, default.id],
+        })
+
+        for user in (ahead, behind, tokyo, default):
+            Habit.objects.create(user=user, name='Leer')
+        # Una consulta de perfiles, y por cada fecha local: hábitos, registros y bulk_update
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recompute_users_by_local_date([ahead.id, behind.id, tokyo.id, default.id], self.NOW), 4)
+        self.assertEqual(sum('FROM "habits_habit"' in q['sql'] for q in queries.captured_queries), 2)
+        self.assertEqual(Habit.objects.get(user=ahead).stats_date, datetime(2026, 1, 2).date())
+        self.assertEqual(Habit.objects.get(user=tokyo).stats_date, datetime(2026, 1, 1).date())
+
+    def test_grouping_reads_only_the_requested_profiles(self):
+        users = [self.create_user(f'usuario{i}', 'Asia/Tokyo') for i in range(5)]
+        self.create_user('otro', 'Pacific/Kiritimati')
+
+        with mock.patch('habits.timezones.PROFILE_CHUNK_SIZE', 2), \
+                CaptureQueriesContext(connection) as queries:
+            groups = group_users_by_local_date([u.id for u in users], self.NOW)
+        self.assertEqual(dict(groups), {datetime(2026, 1, 1).date(): [u.id for u in users]})
+        # Una consulta por bloque, filtrada por los usuarios pedidos
+        self.assertEqual(len(queries.captured_queries), 3)
+        self.assertTrue(all('IN (' in q['sql'] for q in queries.captured_queries))
+
+    def test_sweeper_closes_timers_at_the_users_midnight(self):
+        user = self.create_user('ana', 'Asia/Tokyo')
+        # 23:50 del 1 de enero en Tokio; a las 12:00 UTC ya pasó la medianoche allí
+        started = datetime(2026, 1, 1, 23, 50, tzinfo=get_zone('Asia/Tokyo'))
+        habit = Habit.objects.create(
+            user=user, name='Leer', goal_type='time', target=60,
+            timer_state='running', timer_started_at=started,
+        )
+        self.assertEqual(sweep_expired_timers(datetime(2026, 1, 2, 3, 0, tzinfo=get_zone('UTC'))), 1)
+        log = HabitLog.objects.get(habit=habit)
+        self.assertEqual(log.date, datetime(2026, 1, 1).date())
+        self.assertAlmostEqual(log.value, 10)
@@ -0,0 +1,100 @@
+import operator
+from datetime import datetime, time, timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Habit, HabitLog
+from .stats import invalidate_stats
+from .timezones import get_zone
+
+
+def timer_finalization(habit, now, zone=None):
+    """
+    Devuelve (fecha, minutos) si el temporizador en curso debe cerrarse, o None.
+    Se cierra al alcanzar la meta o al pasar la medianoche local (de `zone`, o la zona
+    activa) del día en que empezó; lo que ocurra primero define el valor registrado.
+    """
+    if habit.timer_state != 'running' or not habit.timer_started_at:
+        return None
+
+    zone = zone or timezone.get_current_timezone()
+    day = timezone.localtime(habit.timer_started_at, zone).date()
+    day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), zone)
+    remaining = max(0.0, habit.target * 60 - habit.accumulated_time)
+    completed_at = habit.timer_started_at + timedelta(seconds=remaining)
+
+    end = min(completed_at, day_end)
+    if end > now:
+        return None
+    elapsed = habit.accumulated_time + (end - habit.timer_started_at).total_seconds()
+    return day, elapsed / 60
+
+
+def _reset_unchanged(pending):
+    """
+    Reinicia los temporizadores de `pending` [(hábito leído, registro)] que siguen en marcha desde
+    la misma hora y devuelve sus registros. Los que cambiaron quedan fuera; el próximo barrido los reintenta.
+    """
+    def reset(items):
+        return Habit.objects.filter(
+            reduce(operator.or_, (Q(id=habit.id, timer_started_at=habit.timer_started_at) for habit, _ in items)),
+            timer_state='running',
+        ).update(timer_state='stopped', timer_started_at=None, accumulated_time=0.0)
+
+    with transaction.atomic():
+        if reset(pending) == len(pending):
+            return [log for _, log in pending]
+        # Se deshace solo este bloque
+        transaction.set_rollback(True)
+    # Algún temporizador cambió después de leerlo: uno por uno para descartar solo esos
+    return [log for habit, log in pending if reset([(habit, log)])]
+
+
+def sweep_expired_timers(now=None):
+    """
+    Cierra en bloque los temporizadores vencidos: registra su HabitLog y los reinicia.
+    Devuelve la cantidad de temporizadores procesados.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Solo los que están en marcha desde antes de ahora (usa habit_timer_idx),
+        # con la zona horaria de cada usuario en la misma consulta
+        running = Habit.objects.select_for_update(of=('self',)).filter(
+            timer_state='running', timer_started_at__lte=now
+        ).annotate(
+            user_timezone=F('user__profile__timezone')
+        ).only('id', 'target', 'timer_state', 'timer_started_at', 'accumulated_time')
+
+        pending = []
+        for habit in running:
+            result = timer_finalization(habit, now, get_zone(habit.user_timezone or settings.TIME_ZONE))
+            if result:
+                day, minutes = result
+                pending.append((habit, HabitLog(habit_id=habit.id, date=day, value=minutes, excluded=False)))
+
+        if not pending:
+            return 0
+
+        # Solo se reinician (y se registran) los temporizadores que siguen como se leyeron: si el
+        # usuario lo detuvo y volvió a iniciar entretanto, no se pisa su registro ni el nuevo temporizador
+        logs = []
+        for i in range(0, len(pending), 200):
+            logs.extend(_reset_unchanged(pending[i:i + 200]))
+        if not logs:
+            return 0
+
+        HabitLog.objects.bulk_create(
+            logs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['habit', 'date'],
+            update_fields=['value', 'excluded'],
+        )
+        # Los registros nuevos cambian la racha de esos hábitos: se recalculan en la próxima
+        # lectura del panel o en rollover_day, que barre antes de recalcular
+        invalidate_stats([log.habit_id for log in logs])
+    return len(logs)
@@ -0,0 +1,101 @@
+import contextvars
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+from django.conf import settings
+from django.utils import timezone
+
+SESSION_KEY = 'habits_timezone'
+
+# Usuarios por consulta de perfiles en group_users_by_local_date
+PROFILE_CHUNK_SIZE = 500
+
+# Fecha local de la petición en curso, fijada por UserTimezoneMiddleware
+_request_today = contextvars.ContextVar('habits_request_today', default=None)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """ZoneInfo por nombre, con caché; nombres desconocidos caen en TIME_ZONE."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+@lru_cache(maxsize=1)
+def timezone_choices():
+    return [(name, name.replace('_', ' ')) for name in sorted(available_timezones())]
+
+
+def local_today():
+    """Día local del usuario: el calculado una vez por petición, o el de la zona activa."""
+    return _request_today.get() or timezone.localdate()
+
+
+def user_timezone_name(user):
+    from .models import UserProfile
+    name = UserProfile.objects.filter(user=user).values_list('timezone', flat=True).first()
+    return name or settings.TIME_ZONE
+
+
+def next_midnight(zone, now=None):
+    now = timezone.localtime(now, zone)
+    return timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min), zone)
+
+
+def group_users_by_local_date(user_ids, now=None):
+    """
+    Agrupa usuarios por su fecha local actual: {fecha: [user_id, ...]}.
+    Las zonas se resuelven una vez cada una, así que cada grupo se procesa con una sola
+    consulta sin importar cuántos usuarios o zonas distintas lo formen. Los perfiles se
+    leen una consulta por cada PROFILE_CHUNK_SIZE usuarios.
+    """
+    from .models import UserProfile
+    now = now or timezone.now()
+    user_ids = list(user_ids)
+    # Solo los perfiles pedidos, en bloques que respetan el límite de parámetros de SQLite
+    zones = {}
+    for i in range(0, len(user_ids), PROFILE_CHUNK_SIZE):
+        zones.update(UserProfile.objects.filter(
+            user_id__in=user_ids[i:i + PROFILE_CHUNK_SIZE]
+        ).values_list('user_id', 'timezone'))
+
+    dates = {}
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        name = zones.get(user_id, settings.TIME_ZONE)
+        if name not in dates:
+            dates[name] = timezone.localtime(now, get_zone(name)).date()
+        groups[dates[name]].append(user_id)
+    return groups
+
+
+class UserTimezoneMiddleware:
+    """
+    Activa la zona horaria del usuario (guardada en la sesión tras la primera consulta)
+    y calcula el día local una sola vez por petición.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            name = request.session.get(SESSION_KEY)
+            if name is None:
+                name = user_timezone_name(user)
+                request.session[SESSION_KEY] = name
+            timezone.activate(get_zone(name))
+        else:
+            timezone.deactivate()
+
+        token = _request_today.set(timezone.localdate())
+        try:
+            return self.get_response(request)
+        finally:
+            _request_today.reset(token)
+            timezone.deactivate()
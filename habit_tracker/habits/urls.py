@@ -6,9 +6,13 @@ urlpatterns = [
     path('habit/create/', views.habit_create, name='habit_create'),
     path('habit/<int:pk>/edit/', views.habit_edit, name='habit_edit'),
     path('habit/<int:pk>/delete/', views.habit_delete, name='habit_delete'),
+    path('habit/<int:pk>/history/', views.habit_history, name='habit_history'),
+    path('habit/<int:pk>/history.json', views.habit_history_json, name='habit_history_json'),
+    path('habit/<int:pk>/history.csv', views.habit_history_csv, name='habit_history_csv'),
     path('log/<int:habit_id>/', views.log_habit, name='log_habit'),
     path('exclude/<int:habit_id>/', views.exclude_day, name='exclude_day'),
     path('statistics/', views.statistics, name='statistics'),
+    path('settings/', views.user_settings, name='user_settings'),
     # Nuevas URLs para el temporizador
     path('timer/<int:habit_id>/action/', views.timer_action, name='timer_action'),
     path('timer/<int:habit_id>/status/', views.timer_status, name='timer_status'),
@@ -5,11 +5,20 @@ from django.utils import timezone
 from django.contrib import messages
 from zoneinfo import ZoneInfo
 from datetime import datetime, time
-from .models import Habit, HabitLog
-from .forms import HabitForm, UserRegisterForm
-from django.http import JsonResponse
+from .models import Habit, HabitLog, UserProfile
+from .forms import HabitForm, HistoryFilterForm, TimezoneForm, UserRegisterForm
+from .history import history_page, iter_history
+from .routers import analytics_reads
+from .timezones import SESSION_KEY, local_today, next_midnight, user_timezone_name
+from .archive import archived_totals
+from .stats import recompute_habits
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+import csv
 import json
 
+# El temporizador no debe pisar las estadísticas precalculadas, que se actualizan aparte
+TIMER_FIELDS = ['timer_state', 'timer_started_at', 'accumulated_time']
+
 def register(request):
     if request.method == 'POST':
         form = UserRegisterForm(request.POST)
@@ -23,18 +32,45 @@ def register(request):
     return render(request, 'registration/register.html', {'form': form})
 
 
+@login_required
+def user_settings(request):
+    if request.method == 'POST':
+        form = TimezoneForm(request.POST)
+        if form.is_valid():
+            name = form.cleaned_data['timezone']
+            UserProfile.objects.update_or_create(user=request.user, defaults={'timezone': name})
+            request.session[SESSION_KEY] = name
+            messages.success(request, f'Zona horaria actualizada: {name}')
+            return redirect('habit_list')
+    else:
+        form = TimezoneForm(initial={'timezone': user_timezone_name(request.user)})
+    return render(request, 'habits/user_settings.html', {'form': form})
+
 @login_required
 def habit_list(request):
-    habits = Habit.objects.filter(user=request.user)
-    today = timezone.localdate()
+    habits = list(Habit.objects.filter(user=request.user))
+    today = local_today()
     
+    # Registros de hoy en una sola consulta
+    today_logs = {
+        log.habit_id: log
+        for log in HabitLog.objects.filter(habit__user=request.user, date=today)
+    }
     for habit in habits:
-        try:
-            habit.today_log = HabitLog.objects.get(habit=habit, date=today)
-        except HabitLog.DoesNotExist:
-            habit.today_log = None
+        habit.today_log = today_logs.get(habit.id)
+
+    # Hábitos nuevos, de otro día o invalidados por un cambio (habits/signals.py): un solo recálculo
+    stale = [habit for habit in habits if not habit.has_fresh_stats()]
+    if stale:
+        recompute_habits(stale, today)
     
-    return render(request, 'habits/habit_list.html', {'habits': habits, 'today': today})
+    # Medianoche de la zona del usuario, no la del navegador: la cuenta regresiva de habit_list.js
+    midnight = next_midnight(timezone.get_current_timezone())
+    return render(request, 'habits/habit_list.html', {
+        'habits': habits,
+        'today': today,
+        'midnight_epoch': int(midnight.timestamp()),
+    })
 
 @login_required
 def habit_create(request):
@@ -56,7 +92,7 @@ def habit_edit(request, pk):
     if request.method == 'POST':
         form = HabitForm(request.POST, instance=habit)
         if form.is_valid():
-            form.save()
+            habit = form.save()
             messages.success(request, 'Hábito actualizado exitosamente!')
             return redirect('habit_list')
     else:
@@ -75,7 +111,7 @@ def habit_delete(request, pk):
 @login_required
 def log_habit(request, habit_id):
     habit = get_object_or_404(Habit, id=habit_id, user=request.user)
-    today = timezone.localdate()
+    today = local_today()
     
     if request.method == 'POST':
         raw = request.POST.get('value', '1')
@@ -113,8 +149,9 @@ def log_habit(request, habit_id):
 @login_required
 def statistics(request):
     stats = []
-    today = timezone.localdate()
+    today = local_today()
     
+    # Los hábitos y sus estadísticas precalculadas se leen de la base principal
     for h in Habit.objects.filter(user=request.user).order_by('name'):
         # Obtener la fecha de creación en la zona horaria local
         created_date = timezone.localtime(h.created_at).date()
@@ -124,15 +161,29 @@ def statistics(request):
         if dias_desde_creacion < 1:
             dias_desde_creacion = 1  # Mínimo 1 día
             
-        # Contar registros únicos HASTA HOY (excluir futuros)
-        logs = HabitLog.objects.filter(habit=h, date__lte=today)  # ¡FILTRO IMPORTANTE!
-        total_registros = logs.values('date').distinct().count()
-        
-        # Calcular días completados (solo hasta hoy)
-        if h.goal_type == 'boolean':
-            completados = logs.filter(value__gte=1, excluded=False).count()
+        if h.has_fresh_stats():
+            # Totales precalculados para hoy (rollover_day / recompute_stats)
+            total_registros = h.cached_registered
+            completados = h.cached_completed
+            racha = h.cached_streak
         else:
-            completados = logs.filter(value__gte=h.target, excluded=False).count()
+            # Agregados sobre el historial: en la copia de análisis si está al día
+            with analytics_reads(request):
+                # Contar registros únicos HASTA HOY (excluir futuros)
+                logs = HabitLog.objects.filter(habit=h, date__lte=today)  # ¡FILTRO IMPORTANTE!
+                total_registros = logs.values('date').distinct().count()
+                
+                # Calcular días completados (solo hasta hoy)
+                if h.goal_type == 'boolean':
+                    completados = logs.filter(value__gte=1, excluded=False).count()
+                else:
+                    completados = logs.filter(value__gte=h.target, excluded=False).count()
+                
+                # Sumar el historial archivado (resúmenes mensuales)
+                archived_completados, archived_registros = archived_totals(h)
+                completados += archived_completados
+                total_registros += archived_registros
+                racha = h.current_streak
         
         # Calcular tasas con protección contra división por cero
         tasa_exito = (completados / total_registros * 100) if total_registros > 0 else 0
@@ -149,7 +200,7 @@ def statistics(request):
             'completados': completados,
             'tasa_exito': round(tasa_exito, 1),
             'tasa_registro': round(tasa_registro, 1),
-            'current_streak': h.current_streak,
+            'current_streak': racha,
         })
     
     return render(request, 'habits/statistics.html', {'stats': stats})
@@ -157,7 +208,7 @@ def statistics(request):
 @login_required
 def exclude_day(request, habit_id):
     habit = get_object_or_404(Habit, id=habit_id, user=request.user)
-    today = timezone.localdate()
+    today = local_today()
     
     if request.method == 'POST':
         # Marcar el log de hoy como excluido
@@ -183,7 +234,7 @@ def timer_action(request, habit_id):
             # Iniciar temporizador
             habit.timer_state = 'running'
             habit.timer_started_at = timezone.now()
-            habit.save()
+            habit.save(update_fields=TIMER_FIELDS)
             
             return JsonResponse({
                 'status': 'started',
@@ -198,7 +249,7 @@ def timer_action(request, habit_id):
                 habit.accumulated_time += current_elapsed
                 habit.timer_state = 'paused'
                 habit.timer_started_at = None
-                habit.save()
+                habit.save(update_fields=TIMER_FIELDS)
             
             return JsonResponse({
                 'status': 'paused',
@@ -210,7 +261,7 @@ def timer_action(request, habit_id):
             # Reanudar temporizador
             habit.timer_state = 'running'
             habit.timer_started_at = timezone.now()
-            habit.save()
+            habit.save(update_fields=TIMER_FIELDS)
             
             return JsonResponse({
                 'status': 'resumed',
@@ -220,7 +271,7 @@ def timer_action(request, habit_id):
             
         elif action == 'stop':
             # Detener y completar el hábito
-            today = timezone.localdate()
+            today = local_today()
             elapsed_minutes = habit.get_current_elapsed_time() / 60  # convertir a minutos
             
             # Crear registro del hábito
@@ -234,7 +285,7 @@ def timer_action(request, habit_id):
             habit.timer_state = 'stopped'
             habit.timer_started_at = None
             habit.accumulated_time = 0.0
-            habit.save()
+            habit.save(update_fields=TIMER_FIELDS)
             
             return JsonResponse({
                 'status': 'completed',
@@ -247,7 +298,7 @@ def timer_action(request, habit_id):
             habit.timer_state = 'stopped'
             habit.timer_started_at = None
             habit.accumulated_time = 0.0
-            habit.save()
+            habit.save(update_fields=TIMER_FIELDS)
             
             return JsonResponse({'status': 'reset'})
     
@@ -263,4 +314,98 @@ def timer_status(request, habit_id):
         'remaining': habit.get_remaining_time(),
         'is_complete': habit.is_timer_complete(),
         'target_minutes': habit.target
-    })
\ No newline at end of file
+    })
+
+
+def _history_filters(request):
+    """Formulario y filtros válidos; un campo inválido no descarta los demás. El cursor va aparte."""
+    form = HistoryFilterForm(request.GET)
+    form.is_valid()
+    return form, {
+        name: form.cleaned_data[name]
+        for name in ('start', 'end', 'status')
+        if name in form.cleaned_data
+    }
+
+
+def _history_status(habit, row):
+    if row['excluded']:
+        return 'excluded'
+    threshold = 1 if habit.goal_type == 'boolean' else habit.target
+    return 'completed' if row['value'] >= threshold else 'missed'
+
+
+@login_required
+def habit_history(request, pk):
+    # El dueño se verifica en la principal: un hábito recién creado puede no estar en la copia
+    habit = get_object_or_404(Habit, pk=pk, user=request.user)
+    form, filters = _history_filters(request)
+    with analytics_reads(request):
+        rows, next_cursor = history_page(habit, filters, form.cleaned_data.get('cursor'))
+    for row in rows:
+        row['status'] = _history_status(habit, row)
+
+    # Conservar los filtros al pasar de página
+    query = request.GET.copy()
+    query.pop('cursor', None)
+
+    return render(request, 'habits/habit_history.html', {
+        'habit': habit,
+        'form': form,
+        'logs': rows,
+        'next_cursor': next_cursor,
+        'query': query.urlencode(),
+    })
+
+
+@login_required
+def habit_history_json(request, pk):
+    habit = get_object_or_404(Habit, pk=pk, user=request.user)
+    form, filters = _history_filters(request)
+    if form.errors:
+        return JsonResponse({'errors': form.errors}, status=400)
+    with analytics_reads(request):
+        rows, next_cursor = history_page(habit, filters, form.cleaned_data.get('cursor'))
+
+    return JsonResponse({
+        'habit': habit.id,
+        'results': [
+            {
+                'date': row['date'].isoformat(),
+                'value': row['value'],
+                'excluded': row['excluded'],
+                'status': _history_status(habit, row),
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+class _Echo:
+    """Buffer mínimo para que csv.writer devuelva cada línea en lugar de guardarla."""
+    def write(self, value):
+        return value
+
+
+@login_required
+def habit_history_csv(request, pk):
+    habit = get_object_or_404(Habit, pk=pk, user=request.user)
+    form, filters = _history_filters(request)
+    if form.errors:
+        # Mejor un error que exportar el historial completo sin los filtros pedidos
+        return HttpResponseBadRequest('Filtros inválidos: ' + '; '.join(
+            f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()
+        ), content_type='text/plain; charset=utf-8')
+    writer = csv.writer(_Echo())
+
+    def rows():
+        yield writer.writerow(['fecha', 'valor', 'excluido', 'estado'])
+        # Se itera después de que la vista retorna: marcar aquí las lecturas de análisis
+        with analytics_reads(request):
+            for row in iter_history(habit, filters):
+                yield writer.writerow([row['date'].isoformat(), row['value'], int(row['excluded']), _history_status(habit, row)])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="habito-{habit.id}-historial.csv"'
+    return response
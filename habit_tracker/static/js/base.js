@@ -0,0 +1,27 @@
+// Toggle Menu Simple y Funcional
+document.addEventListener('DOMContentLoaded', function() {
+    const menuToggle = document.getElementById('menuToggle');
+    const navMenu = document.getElementById('navMenu');
+
+    if (menuToggle && navMenu) {
+        menuToggle.addEventListener('click', function() {
+            navMenu.classList.toggle('active');
+        });
+
+        // Cerrar menú al hacer clic fuera
+        document.addEventListener('click', function(event) {
+            if (!navMenu.contains(event.target) && !menuToggle.contains(event.target)) {
+                navMenu.classList.remove('active');
+            }
+        });
+
+        // Cerrar menú al hacer clic en un enlace (en móviles)
+        navMenu.addEventListener('click', function(event) {
+            if (event.target.tagName === 'A' || event.target.tagName === 'BUTTON') {
+                setTimeout(() => {
+                    navMenu.classList.remove('active');
+                }, 300);
+            }
+        });
+    }
+});
@@ -0,0 +1,378 @@
+class TimerManager {
+    constructor() {
+        this.timers = new Map();
+        this.updateIntervals = new Map();
+    }
+
+    initTimer(habitId) {
+        this.updateTimerDisplay(habitId);
+        this.startTimerUpdates(habitId);
+    }
+
+    startTimerUpdates(habitId) {
+        this.updateTimerStatus(habitId);
+        const interval = setInterval(() => {
+            this.updateTimerStatus(habitId);
+        }, 1000);
+        this.updateIntervals.set(habitId, interval);
+    }
+
+    stopTimerUpdates(habitId) {
+        const interval = this.updateIntervals.get(habitId);
+        if (interval) {
+            clearInterval(interval);
+            this.updateIntervals.delete(habitId);
+        }
+    }
+
+    async updateTimerStatus(habitId) {
+        try {
+            const response = await fetch(`/timer/${habitId}/status/`);
+            const data = await response.json();
+            this.updateTimerDisplay(habitId, data);
+        } catch (error) {
+            console.error('Error updating timer status:', error);
+        }
+    }
+
+    updateTimerDisplay(habitId, data = null) {
+        const display = document.getElementById(`timer-display-${habitId}`);
+        const progressBar = document.getElementById(`timer-progress-${habitId}`);
+        const statusElement = document.getElementById(`timer-status-${habitId}`);
+        
+        if (!display) return;
+
+        if (data) {
+            const remainingSeconds = data.remaining;
+            const minutes = Math.floor(remainingSeconds / 60);
+            const seconds = Math.floor(remainingSeconds % 60);
+            display.textContent = `${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
+
+            const targetSeconds = data.target_minutes * 60;
+            const progressPercent = ((targetSeconds - remainingSeconds) / targetSeconds) * 100;
+            if (progressBar) {
+                progressBar.style.width = `${progressPercent}%`;
+                
+                if (progressPercent >= 100) {
+                    progressBar.style.background = '#28a745';
+                    display.style.color = '#28a745';
+                } else if (progressPercent >= 75) {
+                    progressBar.style.background = '#17a2b8';
+                    display.style.color = '#17a2b8';
+                } else if (data.state === 'running') {
+                    progressBar.style.background = '#007bff';
+                    display.style.color = '#007bff';
+                } else {
+                    progressBar.style.background = '#6c757d';
+                    display.style.color = '#6c757d';
+                }
+            }
+
+            this.updateTimerUI(habitId, data.state);
+            
+            if (statusElement) {
+                if (data.state === 'running') {
+                    statusElement.innerHTML = '⏱️ En progreso...';
+                    statusElement.style.color = '#007bff';
+                } else if (data.state === 'paused') {
+                    statusElement.innerHTML = '⏸️ Pausado';
+                    statusElement.style.color = '#ffc107';
+                } else {
+                    statusElement.innerHTML = 'Listo para comenzar';
+                    statusElement.style.color = '#6c757d';
+                }
+            }
+
+            if (data.is_complete && data.state === 'running') {
+                this.completeTimer(habitId);
+            }
+        }
+    }
+
+    updateTimerUI(habitId, state) {
+        const startBtn = document.querySelector(`.timer-start-btn[data-habit-id="${habitId}"]`);
+        const pauseBtn = document.querySelector(`.timer-pause-btn[data-habit-id="${habitId}"]`);
+        const resumeBtn = document.querySelector(`.timer-resume-btn[data-habit-id="${habitId}"]`);
+
+        if (startBtn) startBtn.style.display = state === 'stopped' || state === 'paused' ? 'block' : 'none';
+        if (pauseBtn) pauseBtn.style.display = state === 'running' ? 'block' : 'none';
+        if (resumeBtn) resumeBtn.style.display = state === 'paused' ? 'block' : 'none';
+    }
+
+    async timerAction(habitId, action) {
+        try {
+            const response = await fetch(`/timer/${habitId}/action/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken()
+                },
+                body: JSON.stringify({ action: action })
+            });
+            
+            const data = await response.json();
+            
+            if (action === 'stop' && data.status === 'completed') {
+                setTimeout(() => {
+                    location.reload();
+                }, 1500);
+            }
+            
+            return data;
+        } catch (error) {
+            console.error('Error performing timer action:', error);
+            return { status: 'error', message: 'Error de conexión' };
+        }
+    }
+
+    startTimer(habitId) {
+        this.timerAction(habitId, 'start');
+    }
+
+    pauseTimer(habitId) {
+        this.timerAction(habitId, 'pause');
+    }
+
+    resumeTimer(habitId) {
+        this.timerAction(habitId, 'resume');
+    }
+
+    async completeTimer(habitId) {
+        const result = await this.timerAction(habitId, 'stop');
+        if (result.status === 'completed') {
+            alert(result.message);
+        }
+    }
+
+    resetTimer(habitId) {
+        if (confirm('¿Reiniciar el temporizador? Se perderá el progreso actual.')) {
+            this.timerAction(habitId, 'reset');
+        }
+    }
+
+    getCSRFToken() {
+        return document.querySelector('[name=csrfmiddlewaretoken]').value;
+    }
+}
+
+const timerManager = new TimerManager();
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.timer-display').forEach(display => {
+        const habitId = display.id.split('-')[2];
+        timerManager.initTimer(habitId);
+    });
+    
+    document.querySelectorAll('.timer-start-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            timerManager.startTimer(habitId);
+        });
+    });
+    
+    document.querySelectorAll('.timer-pause-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            timerManager.pauseTimer(habitId);
+        });
+    });
+    
+    document.querySelectorAll('.timer-resume-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            timerManager.resumeTimer(habitId);
+        });
+    });
+    
+    document.querySelectorAll('.timer-stop-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            timerManager.completeTimer(habitId);
+        });
+    });
+    
+    document.querySelectorAll('.timer-reset-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            timerManager.resetTimer(habitId);
+        });
+    });
+});
+
+function confirmDelete(habitId, habitName) {
+    if (confirm(`¿Estás seguro de que quieres eliminar el hábito "${habitName}"? Esta acción no se puede deshacer.`)) {
+        const form = document.createElement('form');
+        form.method = 'POST';
+        form.action = `/habit/${habitId}/delete/`;
+        
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+        const csrfInput = document.createElement('input');
+        csrfInput.type = 'hidden';
+        csrfInput.name = 'csrfmiddlewaretoken';
+        csrfInput.value = csrfToken;
+        
+        form.appendChild(csrfInput);
+        document.body.appendChild(form);
+        form.submit();
+    }
+}
+
+const habitValues = {};
+const saveTimeouts = {};
+
+function updateIndividualTimers() {
+    const timerElements = document.querySelectorAll('.individual-timer');
+    
+    timerElements.forEach(timer => {
+        const span = timer.querySelector('span');
+        if (!span) return;
+        if (!span.textContent.toLowerCase().includes('completado') && !span.textContent.toLowerCase().includes('excluido')) {
+            // Medianoche en la zona horaria del perfil (epoch del servidor), no la del navegador
+            const midnight = parseInt(timer.dataset.midnight, 10) * 1000;
+            if (!midnight) return;
+            const timeLeft = Math.max(0, midnight - Date.now());
+            const hours = Math.floor(timeLeft / (1000 * 60 * 60));
+            const minutes = Math.floor((timeLeft % (1000 * 60 * 60)) / (1000 * 60));
+
+            let color = '#28a745';
+            if (hours < 4) color = '#dc3545';
+            else if (hours < 8) color = '#ffc107';
+            timer.innerHTML = `<span style="color: ${color};">⏳ ${hours.toString().padStart(2, '0')}h ${minutes.toString().padStart(2, '0')}m</span>`;
+        }
+    });
+}
+
+function initializeNumericHabits() {
+    document.querySelectorAll('.habit-value').forEach(element => {
+        const habitId = element.id.split('-')[1];
+        habitValues[habitId] = parseFloat(element.textContent) || 0;
+        if (!element.dataset.target) element.dataset.target = element.getAttribute('data-target') || '0';
+    });
+
+    document.querySelectorAll('.increment-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            incrementValue(habitId);
+        });
+    });
+
+    document.querySelectorAll('.decrement-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            decrementValue(habitId);
+        });
+    });
+
+    document.querySelectorAll('.save-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const habitId = this.getAttribute('data-habit-id');
+            saveValue(habitId);
+        });
+    });
+}
+
+function incrementValue(habitId) {
+    if (!habitValues.hasOwnProperty(habitId)) return;
+    habitValues[habitId]++;
+    updateDisplay(habitId);
+    clearTimeout(saveTimeouts[habitId]);
+    saveTimeouts[habitId] = setTimeout(() => saveValue(habitId), 1000);
+}
+
+function decrementValue(habitId) {
+    if (!habitValues.hasOwnProperty(habitId)) return;
+    habitValues[habitId]--;
+    if (habitValues[habitId] < 0) habitValues[habitId] = 0;
+    updateDisplay(habitId);
+    clearTimeout(saveTimeouts[habitId]);
+    saveTimeouts[habitId] = setTimeout(() => saveValue(habitId), 2000);
+}
+
+function updateDisplay(habitId) {
+    const valueElement = document.getElementById(`value-${habitId}`);
+    const progressElement = document.getElementById(`progress-${habitId}`);
+    const target = parseFloat(valueElement?.dataset?.target || '0');
+    
+    if (valueElement) {
+        valueElement.textContent = habitValues[habitId];
+    }
+    
+    if (progressElement && target > 0) {
+        const progress = Math.min((habitValues[habitId] / target) * 100, 100);
+        progressElement.style.width = `${progress}%`;
+        if (progress >= 100) progressElement.style.background = '#28a745';
+        else if (progress >= 75) progressElement.style.background = '#17a2b8';
+        else progressElement.style.background = '#007bff';
+    }
+    checkCompletion(habitId);
+}
+
+function showSaveButton(habitId) {
+    const saveBtn = document.querySelector(`.save-btn[data-habit-id="${habitId}"]`);
+    if (saveBtn) saveBtn.style.display = 'block';
+}
+
+function checkCompletion(habitId) {
+    const value = habitValues[habitId];
+    const valueElement = document.getElementById(`value-${habitId}`);
+    const target = parseFloat(valueElement?.dataset?.target || '0');
+    const habitCard = document.getElementById(`habit-${habitId}`);
+    
+    if (value >= target && habitCard) habitCard.classList.add('completed');
+    else if (habitCard) habitCard.classList.remove('completed');
+}
+
+function saveValue(habitId) {
+    const value = habitValues[habitId];
+    const csrfTokenEl = document.querySelector('[name=csrfmiddlewaretoken]');
+    const csrfToken = csrfTokenEl ? csrfTokenEl.value : '';
+    
+    fetch(`/log/${habitId}/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': csrfToken
+        },
+        body: `value=${encodeURIComponent(value)}`
+    })
+    .then(response => {
+        if (response.ok) {
+            const saveBtn = document.querySelector(`.save-btn[data-habit-id="${habitId}"]`);
+            if (saveBtn) saveBtn.style.display = 'none';
+            showMessage('¡Registro guardado!', 'success');
+            setTimeout(() => location.reload(), 800);
+        } else {
+            showMessage('Error al guardar', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showMessage('Error al guardar', 'error');
+    })
+    .finally(() => {
+        clearTimeout(saveTimeouts[habitId]);
+    });
+}
+
+function showMessage(message, type) {
+    const messageDiv = document.createElement('div');
+    messageDiv.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        padding: 1rem;
+        border-radius: 5px;
+        color: white;
+        z-index: 10000;
+        background: ${type === 'success' ? '#28a745' : '#dc3545'};
+    `;
+    messageDiv.textContent = message;
+    document.body.appendChild(messageDiv);
+    setTimeout(() => messageDiv.remove(), 3000);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    updateIndividualTimers();
+    initializeNumericHabits();
+    setInterval(updateIndividualTimers, 60000);
+});